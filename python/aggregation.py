@@ -0,0 +1,152 @@
+import numpy as np, pandas as pd
+
+HEIGHTS = ("low", "mid", "top")
+
+def origin(time):
+    # même origine que pandas resample (origin="start_day")
+    return time[0].astype("datetime64[D]").astype(time.dtype)
+
+def to_offset(window):
+    # "1H" (ancienne notation pandas, cf. README) accepté comme "1h"
+    if isinstance(window, str) and window.endswith("H"): window = window[:-1]+"h"
+    return pd.tseries.frequencies.to_offset(window)
+
+def is_fixed(window):
+    # pas de durée fixe (h, min, D, 7D...) ; "W", "MS", "ME"... suivent le calendrier (ancrage pandas)
+    return isinstance(to_offset(window), (pd.offsets.Tick, pd.offsets.Day))
+
+def window_width(window):
+    if not is_fixed(window): raise ValueError(f"AVG_WINDOW={window!r} : intervalle calendaire, pas de durée fixe")
+    off = to_offset(window)
+    # Day n'est plus un Tick depuis pandas 3 : durée fixe de 24 h pour des horodatages sans fuseau
+    w = np.timedelta64(off.n, "D").astype("m8[ns]") if isinstance(off, pd.offsets.Day) else pd.Timedelta(off).to_timedelta64()
+    if w <= np.timedelta64(0, "ns"): raise ValueError(f"AVG_WINDOW={window!r} : durée > 0 requise")
+    return w
+
+def ratio(s, c):
+    # s/c avec NaN là où c == 0, sans "Mean of empty slice" ni division par zéro
+    s = np.asarray(s); out = np.full_like(s, np.nan, dtype=float)
+    np.divide(s, c, out=out, where=np.asarray(c) > 0)
+    return out
+
+def masked_sum(a, axis=None):
+    ok = ~np.isnan(a)
+    return np.where(ok, a, 0.).sum(axis), ok.sum(axis)
+
+def nanmean(a, axis=None):
+    return ratio(*masked_sum(np.asarray(a, float), axis))
+
+def row_values(low, mid, top, heights=True, stations=True):
+    # un seul passage par hauteur : moyenne des stations à chaque instant par hauteur (n, 3) et/ou
+    # moyenne verticale des trois hauteurs par station (n, m), sans empiler de copie 3 x n ; None si non demandé.
+    # Ordre Fortran : les réductions par intervalle (reduceat sur l'axe 0) sont ~20x plus rapides.
+    n, m = np.shape(low)
+    if heights: hs, hc = np.zeros((n, 3), order="F"), np.zeros((n, 3), np.int32, order="F")
+    if stations: ss, sc = np.zeros((n, m), order="F"), np.zeros((n, m), np.int32, order="F")
+    for k, a in enumerate((low, mid, top)):
+        ok = ~np.isnan(a); z = np.where(ok, a, 0.)
+        if heights: hs[:, k], hc[:, k] = z.sum(1), np.count_nonzero(ok, 1)
+        if stations: ss += z; sc += ok
+    return (ratio(hs, hc) if heights else None), (ratio(ss, sc) if stations else None)
+
+def height_values(low, mid, top):
+    return row_values(low, mid, top, stations=False)[0]
+
+def station_values(low, mid, top):
+    return row_values(low, mid, top, heights=False)[1]
+
+def group_matrix(groups, n_stations=29):
+    M = np.zeros((n_stations, len(groups)))
+    for g, st in enumerate(groups): M[np.asarray(st)-1, g] = 1.
+    return M
+
+def group_means(values, groups):
+    # moyenne (NaN ignorés) des stations de chaque groupe : (m, n_stations) -> (m, len(groups))
+    ok = ~np.isnan(values); M = group_matrix(groups, values.shape[1])
+    return ratio(np.where(ok, values, 0.) @ M, ok @ M)
+
+FIELDS = ("heights", "stations")
+
+class Accumulator:
+    # moyennes par intervalle (hauteurs, stations, groupes) tenues à jour par sommes / comptes :
+    # update() sur les nouvelles lignes seulement, sans recalculer l'historique.
+    # fields : moyennes tenues, ("heights",) suffit à Stratification.py (pas de moyenne par station calculée)
+    def __init__(self, window, n_stations=29, chunk_rows=50_000, fields=FIELDS):
+        if not window: raise ValueError("AVG_WINDOW=0 : pas d'intervalle, utiliser aggregate()")
+        if not fields or any(f not in FIELDS for f in fields): raise ValueError(f"fields parmi {FIELDS}")
+        self.width, self.chunk_rows, self.fields = window_width(window), chunk_rows, tuple(fields)
+        self.origin = self.b0 = None
+        cols = {"heights": 3, "stations": n_stations}
+        self.sum = {f: np.zeros((0, cols[f])) for f in self.fields}
+        self.count = {f: np.zeros((0, cols[f]), np.int64) for f in self.fields}
+
+    def __len__(self):
+        return len(self.sum[self.fields[0]])
+
+    @property
+    def time(self):
+        if self.origin is None: return np.array([], "datetime64[ns]")
+        return self.origin+(self.b0+np.arange(len(self)))*self.width
+
+    def update(self, time, low, mid, top):
+        if len(time) == 0: return self
+        if self.origin is None:
+            self.origin = origin(time); self.b0 = int((time[0]-self.origin)//self.width)
+        b = ((time-self.origin)//self.width).astype(np.int64)-self.b0
+        if b[0] < 0 or np.any(b[1:] < b[:-1]):
+            raise ValueError("lignes non triées ou antérieures au début de l'agrégation")
+        grow = int(b[-1])+1-len(self)
+        if grow > 0:
+            for d in (self.sum, self.count):
+                for f, a in d.items(): d[f] = np.concatenate([a, np.zeros((grow,)+a.shape[1:], a.dtype)])
+        want = {f: f in self.fields for f in FIELDS}
+        for r0 in range(0, len(time), self.chunk_rows):
+            sl = slice(r0, r0+self.chunk_rows); bb = b[sl]
+            starts = np.flatnonzero(np.r_[True, bb[1:] != bb[:-1]]); ub = bb[starts]
+            rows = row_values(*(np.asarray(a[sl]) for a in (low, mid, top)), **want)
+            for f, v in zip(FIELDS, rows):
+                if v is None: continue
+                ok = ~np.isnan(v)
+                self.sum[f][ub] += np.add.reduceat(np.where(ok, v, 0.), starts, axis=0)
+                self.count[f][ub] += np.add.reduceat(ok.astype(np.int32), starts, axis=0)
+        return self
+
+    def mean(self, field):
+        if field not in self.fields: raise KeyError(f"{field} non calculé : Accumulator(..., fields=...) à compléter")
+        return ratio(self.sum[field], self.count[field])
+
+    def height_mean(self, h):
+        return self.mean("heights")[:, HEIGHTS.index(h)]
+
+    def station_means(self):
+        return self.mean("stations")
+
+    def group_means(self, groups):
+        return group_means(self.station_means(), groups)
+
+class Means:
+    # moyennes déjà calculées, même interface qu'Accumulator (time, height_mean, station_means, group_means)
+    def __init__(self, time, values):
+        self.time, self.values = time, values
+
+    def __len__(self):
+        return len(self.time)
+
+    def mean(self, field):
+        if field not in self.values: raise KeyError(f"{field} non calculé : aggregate(..., fields=...) à compléter")
+        return self.values[field]
+
+    height_mean, station_means, group_means = Accumulator.height_mean, Accumulator.station_means, Accumulator.group_means
+
+def aggregate(time, low, mid, top, window, fields=FIELDS):
+    # window 0 : valeurs instantanées (aucun moyennage) ; durée fixe : Accumulator en un passage ;
+    # intervalle calendaire ("W", "MS", "ME"...) : resample(window).mean() de pandas sur les valeurs par ligne
+    if window and is_fixed(window): return Accumulator(window, np.shape(low)[1], fields=fields).update(time, low, mid, top)
+    rows = row_values(low, mid, top, **{f: f in fields for f in FIELDS})
+    if not window: return Means(time, {f: v for f, v in zip(FIELDS, rows) if v is not None})
+    index = pd.DatetimeIndex(time); values = {}
+    for f, v in zip(FIELDS, rows):
+        if v is None: continue
+        r = pd.DataFrame(v, index=index).resample(to_offset(window)).mean()
+        values[f] = r.to_numpy()
+    return Means(r.index.to_numpy(), values)
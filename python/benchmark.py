@@ -0,0 +1,152 @@
+import argparse, json, os, platform, sys, tempfile, time, warnings
+import numpy as np, pandas as pd
+from data_analyzer import save_npz, load_npz, save_store, load_store, load_raw_csv, load_raw_csv_chunked
+from simulation_thermique import load_parameters, simulate, simulate_batch, compute_resistances, compile_batch
+from parametres import compile_parameters
+from dataset import Dataset
+from aggregation import Accumulator
+from rollups import LEVELS, build_rollups, save_rollups
+from decimation import minmax, rollup_level
+from solveur_frequentiel import periodic_response, periodic_batch
+
+warnings.filterwarnings("ignore", message="Mean of empty slice")
+BASELINE = "benchmarks/baseline.json"
+N_STATIONS = 29
+
+def synthetic_dataset(days=365, step_min=2, dead=.05, seed=0):
+    # 29 stations x 3 hauteurs, capteurs morts (NaN) et trous aléatoires
+    rng = np.random.default_rng(seed); n = days*24*60//step_min
+    time = np.datetime64("2024-01-01")+np.arange(n)*np.timedelta64(step_min, "m")
+    h = np.arange(n)*step_min/60
+    T_out = -8+8*np.cos(2*np.pi*(h-15)/24)+rng.normal(0, .5, n)
+    RH_out = 70+10*rng.standard_normal(n)
+    arrs = []
+    for off in (0., 2., 4.):
+        a = (20+off+5*np.cos(2*np.pi*h/24)[:, None]+rng.normal(0, 1, (n, N_STATIONS))).astype(float)
+        a[rng.random((n, N_STATIONS)) < dead] = np.nan
+        a[:, rng.integers(0, N_STATIONS)] = np.nan
+        arrs.append(a)
+    return time, T_out, RH_out, *arrs
+
+def synthetic_csv(path, days=30):
+    t, T_out, RH_out, low, mid, top = synthetic_dataset(days)
+    df = pd.DataFrame(np.column_stack([T_out, RH_out, low, mid, top]), columns=["T_out", "RH_out"]+[f"C{i}" for i in range(3*N_STATIONS)])
+    df.insert(0, "time", pd.to_datetime(t).strftime("%d/%m/%Y %H:%M"))
+    df.to_csv(path, sep=";", decimal=",", index=False)
+
+def timeit(fn, repeat=5, number=1):
+    fn(); out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number): fn()
+        out.append((time.perf_counter()-t0)/number)
+    return {"min": min(out), "median": float(np.median(out))}
+
+def stratification(time_, low, mid, top, window="1D"):
+    df = pd.DataFrame({"time": time_, "mean_low": np.nanmean(low, 1), "mean_mid": np.nanmean(mid, 1), "mean_top": np.nanmean(top, 1)})
+    return df.set_index("time").resample(window).mean()
+
+def plateau(time_, low, mid, top, groups, window="1D"):
+    df = pd.DataFrame({"time": pd.to_datetime(time_)}).set_index("time")
+    for i in range(N_STATIONS): df[f"S{i+1}"] = np.nanmean(np.vstack([low[:, i], mid[:, i], top[:, i]]), axis=0)
+    df = df.resample(window).mean()
+    return [df[[f"S{i}" for i in g]].mean(axis=1) for g in groups]
+
+def plot_data(time_, arrs, start, end, stations):
+    m = (time_ >= np.datetime64(start)) & (time_ <= np.datetime64(end))
+    t = time_[m]
+    return t, [a[m, s-1] for a in arrs for s in stations]
+
+def plot_data_indexed(ds, start, end, stations):
+    s = ds.index(start, end)
+    return ds.time[s], [a[s, k-1] for a in (ds.low, ds.mid, ds.top) for k in stations]
+
+def plot_rollup(ds, start, end, stations, n_px=1000):
+    # même choix que DataGrapherApp.series : rollup le plus grossier dont le pas tient dans un pixel,
+    # enveloppe min / max des rollups, données brutes si aucun niveau ne convient
+    s = ds.index(start, end); t = ds.time[s]
+    lvl = rollup_level(t[-1]-t[0], n_px, [l for l in LEVELS if ds.rollup(l) is not None])
+    if lvl is None: return plot_envelope(ds, start, end, stations, n_px)
+    r = ds.rollup(lvl).window(t[0]-LEVELS[lvl], t[-1])
+    out = []
+    for h in ("low", "mid", "top"):
+        lo, hi = r.data[h]["min"], r.data[h]["max"]
+        out += [minmax(r.time, lo[:, k-1], hi[:, k-1], n_px) or (r.time, lo[:, k-1], hi[:, k-1]) for k in stations]
+    return out
+
+def plot_envelope(ds, start, end, stations, n_px=1000):
+    s = ds.index(start, end); t = ds.time[s]
+    return [minmax(t, a[s, k-1], n_px=n_px) for a in (ds.low, ds.mid, ds.top) for k in stations]
+
+def suite(scale):
+    p = load_parameters(); days = 365 if scale == "full" else 30
+    data = synthetic_dataset(days)
+    tmp = tempfile.TemporaryDirectory(); npz = os.path.join(tmp.name, "DataSet.npz"); save_npz(npz, *data)
+    csv = os.path.join(tmp.name, "DataSet.csv"); synthetic_csv(csv)
+    store = os.path.join(tmp.name, "DataSet"); save_store(store, *data); save_rollups(store, build_rollups(*data))
+    w0, w1 = len(data[0])//2, len(data[0])//2+14*720
+    ds = Dataset.open(store)
+    t_, T_out, RH_out, low, mid, top = data
+    groups = [[2, 3, 4], [6, 7, 8], [10, 11, 12], [14, 15, 16, 17, 18], [20, 21, 22], [24, 25, 26, 27, 28]]
+    b = {
+        "simulate_loop_48h_dt1m": lambda: simulate(p, 1/60, 48),
+        "simulate_kernel_48h_dt1m": lambda: simulate(p, 1/60, 48, mode="kernel"),
+        "simulate_kernel_168h_dt15s": lambda: simulate(p, 1/240, 168, mode="kernel"),
+        "simulate_implicit_168h_dt15m": lambda: simulate(p, .25, 168, mode="implicit"),
+        "simulate_adaptive_168h": lambda: simulate(p, t_end=168, mode="adaptive"),
+        "simulate_batch_1000x48h": lambda: simulate_batch(p, {"proprietes.h_int": np.linspace(5, 20, 1000)}, 1/60, 48),
+        "periodic_response": lambda: periodic_response(p),
+        "periodic_batch_1000": lambda: periodic_batch(p, {"proprietes.k_isolant": np.linspace(.01, .1, 1000)}),
+        "compute_resistances": lambda: compute_resistances(p),
+        "compile_parameters": lambda: compile_parameters(p),
+        "compile_batch_100k": lambda: compile_batch(p, {"proprietes.k_isolant": np.linspace(.01, .05, 100_000), "proprietes.h_ext": np.linspace(15, 45, 100_000)}),
+        "load_npz": lambda: load_npz(npz),
+        "npz_window_top_S1_14d": lambda: np.array(load_npz(npz)[5][w0:w1, 0]),
+        "store_window_top_S1_14d": lambda: np.array(load_store(store)[5][w0:w1, 0]),
+        "csv_ingest_python_30d": lambda: load_raw_csv(csv),
+        "csv_ingest_chunked_30d": lambda: load_raw_csv_chunked(csv),
+        "stratification_1D": lambda: stratification(t_, low, mid, top),
+        "plateau_groups_1D": lambda: plateau(t_, low, mid, top, groups),
+        "stratification_1D_accumulator": lambda: Accumulator("1D", fields=("heights",)).update(t_, low, mid, top).mean("heights"),
+        "plateau_groups_1D_accumulator": lambda: Accumulator("1D", fields=("stations",)).update(t_, low, mid, top).group_means(groups),
+        "build_rollups": lambda: build_rollups(*data),
+        "stratification_1D_rollup": lambda: [Dataset.open(store).rollup_for("1D").height_mean(h) for h in ("low", "mid", "top")],
+        "plot_data_all_stations": lambda: plot_data(t_, (low, mid, top), t_[len(t_)//4], t_[3*len(t_)//4], range(1, N_STATIONS+1)),
+        "plot_data_indexed_all_stations": lambda: plot_data_indexed(ds, t_[len(t_)//4], t_[3*len(t_)//4], range(1, N_STATIONS+1)),
+        "plot_rollup_all_stations": lambda: plot_rollup(Dataset.open(store), t_[len(t_)//4], t_[3*len(t_)//4], range(1, N_STATIONS+1)),
+        "plot_envelope_all_stations": lambda: plot_envelope(ds, t_[len(t_)//4], t_[3*len(t_)//4], range(1, N_STATIONS+1)),
+        "dataset_window_index": lambda: ds.index(t_[len(t_)//4], t_[3*len(t_)//4]),
+    }
+    repeat = {"csv_ingest_python_30d": 3, "simulate_loop_48h_dt1m": 3, "simulate_kernel_168h_dt15s": 3, "simulate_adaptive_168h": 3, "simulate_batch_1000x48h": 3}
+    res = {}
+    for name, fn in b.items():
+        res[name] = timeit(fn, repeat.get(name, 5))
+        print(f"{name:32s} {res[name]['min']*1e3:10.2f} ms")
+    tmp.cleanup()
+    return res
+
+def meta(scale):
+    return {"scale": scale, "python": sys.version.split()[0], "numpy": np.__version__, "pandas": pd.__version__,
+            "machine": platform.machine(), "date": time.strftime("%Y-%m-%d")}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scale", choices=("full", "small"), default="full")
+    ap.add_argument("--save", action="store_true", help="enregistrer comme référence")
+    ap.add_argument("--tolerance", type=float, default=1.25)
+    a = ap.parse_args()
+    res = suite(a.scale)
+    if a.save:
+        os.makedirs(os.path.dirname(BASELINE), exist_ok=True)
+        with open(BASELINE, "w", encoding="utf-8") as f: json.dump({"meta": meta(a.scale), "results": res}, f, indent=2)
+        print("Référence enregistrée :", BASELINE)
+    elif os.path.exists(BASELINE):
+        with open(BASELINE, encoding="utf-8") as f: base = json.load(f)
+        if base["meta"]["scale"] != a.scale: print("Référence à une autre échelle, comparaison ignorée"); sys.exit()
+        slow = []
+        for k, r in res.items():
+            if k not in base["results"]: print(f"{k:32s} (nouveau)"); continue
+            ratio = r["min"]/base["results"][k]["min"]
+            print(f"{k:32s} x{ratio:5.2f}"+("  <-- régression" if ratio > a.tolerance else ""))
+            if ratio > a.tolerance: slow.append(k)
+        sys.exit(1 if slow else 0)
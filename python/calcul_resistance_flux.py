@@ -1,4 +1,5 @@
 import math
+import numpy as np
 
 def resistance_convection(h, A):
     if h <= 0: raise ValueError("h > 0")
@@ -39,3 +40,53 @@ def flux_massique(m_dot, cp, T_up, T_down):
 
 def temperature_harmonique(t, T_mean, A, t0, phi=0.0):
     return T_mean + A * math.cos(2 * math.pi * (t - phi) / t0)
+
+# variantes tableaux : h, k, L, A de forme quelconque (panneaux, échantillons d'un balayage...),
+# diffusées entre elles ; toutes les valeurs invalides sont signalées ensemble
+
+def check_positive(**values):
+    msgs = []
+    for name, x in values.items():
+        bad = np.squeeze(~(np.asarray(x, float) > 0))
+        if not bad.any(): continue
+        idx = np.flatnonzero(bad).tolist() if bad.ndim <= 1 else [tuple(i) for i in np.argwhere(bad).tolist()]
+        msgs.append(f"{name} > 0 ({len(idx)} valeur(s) invalide(s), indices {idx[:20]}{' ...' if len(idx) > 20 else ''})")
+    if msgs: raise ValueError("; ".join(msgs))
+
+def resistance_convection_vec(h, A):
+    check_positive(h=h, A=A)
+    return 1.0 / (np.asarray(h, float) * A)
+
+def resistance_conduction_vec(L, k, A):
+    check_positive(L=L, k=k, A=A)
+    return np.asarray(L, float) / (np.asarray(k, float) * A)
+
+def resistance_serie_vec(*resistances):
+    check_positive(**{f"R{i+1}": R for i, R in enumerate(resistances)})
+    return sum(np.asarray(R, float) for R in resistances)
+
+def resistance_parallele_vec(*resistances):
+    check_positive(**{f"R{i+1}": R for i, R in enumerate(resistances)})
+    return 1.0 / sum(1.0 / np.asarray(R, float) for R in resistances)
+
+def resistance_multicouche_vec(L, k, A, h_int=None, h_ext=None):
+    # paroi multicouche : L, k (..., n_couches) sur le dernier axe, A (...) ; convection optionnelle de chaque côté
+    L, k, A = np.asarray(L, float), np.asarray(k, float), np.asarray(A, float)
+    check_positive(L=L, k=k, A=A)
+    R = np.sum(L / (k * A[..., None]), axis=-1)
+    if h_int is not None: R = R + resistance_convection_vec(h_int, A)
+    if h_ext is not None: R = R + resistance_convection_vec(h_ext, A)
+    return R
+
+def resistance_vers_exterieur_vec(h_int, h_ext, L_plaque, k_plaque, L_asphalte, k_asphalte, A):
+    check_positive(h_int=h_int, h_ext=h_ext, L_plaque=L_plaque, k_plaque=k_plaque,
+                   L_asphalte=L_asphalte, k_asphalte=k_asphalte, A=A)
+    A = np.asarray(A, float)
+    return (1.0 / (np.asarray(h_int, float) * A) + np.asarray(L_plaque, float) / (np.asarray(k_plaque, float) * A)
+            + np.asarray(L_asphalte, float) / (np.asarray(k_asphalte, float) * A) + 1.0 / (np.asarray(h_ext, float) * A))
+
+def resistance_vers_sol_vec(h_int, L_ciment, k_ciment, L_isolant, k_isolant, A):
+    check_positive(h_int=h_int, L_ciment=L_ciment, k_ciment=k_ciment, L_isolant=L_isolant, k_isolant=k_isolant, A=A)
+    A = np.asarray(A, float)
+    return (1.0 / (np.asarray(h_int, float) * A) + np.asarray(L_ciment, float) / (np.asarray(k_ciment, float) * A)
+            + np.asarray(L_isolant, float) / (np.asarray(k_isolant, float) * A))
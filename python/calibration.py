@@ -0,0 +1,126 @@
+import json, os, numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from simulation_thermique import load_parameters, simulate_batch
+from forcage import MeasuredForcing
+from dataset import Dataset
+from aggregation import station_values, group_means
+from optimisation import map_shards, minimize_cem
+
+# calage du modèle sur les mesures : zone i <-> groupe de stations GROUPS[i] (comme Plateau.py),
+# forçage par T_out mesurée, écart = RMSE entre zones simulées et moyennes verticales des groupes
+
+GROUPS = [
+    [2, 3, 4],
+    [6, 7, 8],
+    [10, 11, 12],
+    [14, 15, 16, 17, 18],
+    [20, 21, 22],
+    [24, 25, 26, 27, 28]
+]
+FITTED = ("proprietes.h_int", "proprietes.h_ext", "proprietes.k_isolant", "proprietes.k_ciment",
+          "infiltration.gap_1", "infiltration.gap_2", "infiltration.gap_3", "infiltration.gap_4", "infiltration.gap_5",
+          "infiltration.gap_front", "infiltration.gap_back")
+
+def measured_zones(npz_path, start=None, end=None, groups=GROUPS):
+    # (time, (n, n_groupes)) : moyenne verticale par station puis moyenne du groupe, NaN ignorés
+    ds = Dataset.open(npz_path).window(start, end)
+    return ds.time, group_means(station_values(ds.low, ds.mid, ds.top), groups)
+
+def on_grid(t, y, grid, max_gap=.5):
+    # interpolation par zone sur la grille du modèle [h] ; NaN si la mesure valide la plus proche est à plus de max_gap h
+    out = np.full((len(grid), y.shape[1]), np.nan)
+    for z in range(y.shape[1]):
+        ok = ~np.isnan(y[:, z])
+        if ok.sum() < 2: continue
+        tz = t[ok]; k = np.clip(np.searchsorted(tz, grid), 1, len(tz)-1)
+        near = np.minimum(np.abs(grid-tz[k-1]), np.abs(tz[k]-grid))
+        out[:, z] = np.where(near <= max_gap, np.interp(grid, tz, y[ok, z], left=np.nan, right=np.nan), np.nan)
+    return out
+
+class Calibration:
+    # paramètres cherchés en facteurs log autour des valeurs du JSON : valeur = base*exp(theta), |theta| <= ln(factor).
+    # Écart comparé en moyennes sur average heures : les marche / arrêt des aérothermes font une dent de scie
+    # dont la phase dépend de tout paramètre, l'écart instantané serait très irrégulier pour l'optimiseur.
+    def __init__(self, p, npz_path=r"dataverse_files\DataSet.npz", start=None, end=None, groups=GROUPS, names=FITTED,
+                 dt=1/60, stride=10, warmup=24., average=3., factor=4., controller=None):
+        if len(groups) != 6: raise ValueError("un groupe de stations par zone (6) requis")
+        self.p, self.names, self.dt, self.stride, self.controller = p, list(names), dt, stride, controller
+        self.bc = MeasuredForcing(p, npz_path, start, end)
+        self.base = np.array([p[n.split(".")[0]][n.split(".")[1]] for n in self.names], float)
+        self.bound = np.log(factor)
+        n = int(self.bc.duration/dt)+1
+        self.grid = np.linspace(0, self.bc.duration, n)[::stride]
+        t, G = measured_zones(npz_path, start, end, groups)
+        self.target = on_grid((t-self.bc.start)/np.timedelta64(1, "h"), G, self.grid)
+        if np.isnan(self.target[0]).all(): raise ValueError("pas de mesure des zones au début de l'intervalle")
+        # état initial mesuré (zone sans mesure : moyenne des autres), premières warmup heures hors critère
+        T0 = self.target[0]; self.T0 = np.where(np.isnan(T0), np.nanmean(T0), T0)
+        self.mask = (self.grid >= warmup)[:, None] & ~np.isnan(self.target)
+        if not self.mask.any(): raise ValueError(f"aucune mesure après les {warmup} h de mise en régime")
+        self.block = max(1, int(round(average/(dt*stride))))
+        self.n_blocks = len(self.grid)//self.block
+        self.counts = self.blocks(self.mask)
+
+    def values(self, theta):
+        return self.base*np.exp(np.atleast_2d(theta))
+
+    def simulate(self, theta):
+        # (N, n_grille, 6) : toutes les zones de tous les candidats en un lot vectorisé
+        V = self.values(theta)
+        overrides = {n: V[:, k] for k, n in enumerate(self.names)}
+        _, T = simulate_batch(self.p, overrides, self.dt, self.bc.duration, reduce="series", stride=self.stride,
+                              bc=self.bc, controller=self.controller, T0=self.T0)
+        return T
+
+    def blocks(self, a):
+        # sommes par bloc de average heures : (..., n_grille, 6) -> (..., n_blocs, 6)
+        n = self.n_blocks*self.block
+        return a[..., :n, :].reshape(a.shape[:-2]+(self.n_blocks, self.block, a.shape[-1])).sum(-2)
+
+    def block_errors(self, theta):
+        # (N, n_blocs, 6) : écart moyen par bloc sur les instants mesurés, 0 pour un bloc sans mesure
+        d = self.blocks(np.where(self.mask, self.simulate(theta)-self.target, 0.))
+        return d/np.maximum(self.counts, 1)
+
+    def zone_errors(self, theta):
+        # (N, 6) : RMSE par zone des moyennes par bloc
+        return np.sqrt((self.block_errors(theta)**2).sum(1)/np.maximum((self.counts > 0).sum(0), 1))
+
+    def error(self, theta):
+        # RMSE globale des moyennes par bloc (toutes zones)
+        return np.sqrt((self.block_errors(theta)**2).sum((1, 2))/(self.counts > 0).sum())
+
+    def fit(self, pop=48, iters=25, seed=0, workers=None):
+        workers = workers or os.cpu_count()
+        lo, hi = np.full(len(self.names), -self.bound), np.full(len(self.names), self.bound)
+        ex = ProcessPoolExecutor(workers) if workers > 1 else None
+        try:
+            f = lambda X: map_shards(calibration_errors, X, (self,), workers, ex)
+            theta, err, history = minimize_cem(f, lo, hi, pop, iters=iters, seed=seed, x0=np.zeros(len(self.names)))
+        finally:
+            if ex is not None: ex.shutdown()
+        return {"params": dict(zip(self.names, self.values(theta)[0])), "theta": theta, "rmse": err,
+                "rmse_initial": self.error(np.zeros(len(self.names)))[0], "zone_rmse": self.zone_errors(theta)[0],
+                "history": history}
+
+    def calibrated(self, params):
+        q = json.loads(json.dumps(self.p))
+        for n, v in params.items():
+            sec, name = n.split("."); q[sec][name] = float(v)
+        return q
+
+def calibration_errors(theta, cal):
+    return cal.error(theta)
+
+if __name__ == "__main__":
+    # passe nocturne : 7 derniers jours de mesures -> JSON/donnees_calibrees.json
+    p = load_parameters()
+    path = r"dataverse_files\DataSet.npz"
+    end = Dataset.open(path).time[-1]
+    cal = Calibration(p, path, end-np.timedelta64(7, "D"), end)
+    res = cal.fit()
+    print(f"RMSE : {res['rmse_initial']:.2f} °C -> {res['rmse']:.2f} °C")
+    for i, e in enumerate(res["zone_rmse"], start=1): print(f"Zone {i} (S {GROUPS[i-1]}) : {e:.2f} °C")
+    for n, v in res["params"].items(): print(f"{n:26s} {v:.5g}")
+    with open("JSON/donnees_calibrees.json", "w", encoding="utf-8") as f:
+        json.dump(cal.calibrated(res["params"]), f, indent=4, ensure_ascii=False)
@@ -0,0 +1,130 @@
+import copy
+import numpy as np
+
+# régulation des aérothermes : un contrôleur met à jour toutes les zones (et tous les échantillons d'un lot)
+# en une opération par pas. T : (n_zones,) ou (N, n_zones) ; les paramètres se diffusent contre cette forme,
+# (N, 1) pour un réglage par échantillon, (n_zones,) pour un réglage par zone.
+
+class Controller:
+    PARAMS = ()
+
+    def reset(self, K, shape, dt):
+        self.P = K.P; self.dt = dt
+        self.heaters, self.zero = np.zeros(shape, bool), np.zeros(shape)
+        self.scalar = all(np.ndim(getattr(self, name)) == 0 for name in self.PARAMS)
+        self.energy, self.steps, self.cycles = np.zeros(shape), np.zeros(shape, int), np.zeros(shape, int)
+        return self
+
+    def __call__(self, t, T, Te, dt):
+        # puissance de chaque aérotherme sur le pas [W], avec comptage énergie / durée / démarrages ;
+        # Q > 0 seulement pour un aérotherme en marche : rien à compter si tous sont restés à l'arrêt
+        was = self.heaters.copy()
+        Q = self.control(t, T, Te, dt)
+        if np.count_nonzero(was) or np.count_nonzero(self.heaters):
+            self.energy += Q; self.steps += self.heaters; self.cycles += self.heaters > was
+        return Q
+
+    def control(self, t, T, Te, dt):
+        raise NotImplementedError
+
+    def report(self):
+        return {"heater_hours": self.steps*self.dt, "heater_kWh": self.energy*self.dt/1000, "cycles": self.cycles}
+
+    def subset(self, sl, N):
+        # contrôleur restreint aux échantillons sl d'un lot de N (paramètres (N, 1) ou (N, n_zones))
+        c = copy.copy(self)
+        for name in self.PARAMS:
+            v = getattr(self, name)
+            if np.ndim(v) == 2 and np.shape(v)[0] == N: setattr(c, name, np.asarray(v)[sl])
+        return c
+
+class ThresholdController(Controller):
+    # règle d'origine : arrêt de tous si T_ext > T_ext_on ou Tm = (T1+T6)/2 > Tm_max, puis verrou de lockout [h] ;
+    # marche si T_ext < T_ext_on et verrou échu
+    PARAMS = ("T_ext_on", "Tm_max", "lockout")
+
+    def __init__(self, T_ext_on=-1., Tm_max=38.75, lockout=5/60):
+        self.T_ext_on, self.Tm_max, self.lockout = T_ext_on, Tm_max, lockout
+
+    def reset(self, K, shape, dt):
+        super().reset(K, shape, dt)
+        self.timers = np.zeros(shape)
+        return self
+
+    def control(self, t, T, Te, dt):
+        h, timers = self.heaters, self.timers
+        if np.count_nonzero(timers): np.maximum(timers-dt, 0, out=timers)
+        if T.ndim == 1 and self.scalar:
+            # simulation unique à réglage commun : décision scalaire, pas d'opération tableau inutile
+            if Te > self.T_ext_on or .5*(T[0]+T[-1]) > self.Tm_max:
+                if np.count_nonzero(h): timers[h] = self.lockout; h[:] = False
+                return self.zero
+            if not Te < self.T_ext_on: return self.zero
+            libre = timers <= 0
+            h |= libre
+            return np.where(libre, self.P, 0.)
+        off = (Te > self.T_ext_on) | (.5*(T[..., :1]+T[..., -1:]) > self.Tm_max)
+        if np.count_nonzero(h):
+            np.copyto(timers, self.lockout, where=off & h)
+            np.copyto(h, False, where=off)
+        libre = ~off & (Te < self.T_ext_on) & (timers <= 0)
+        h |= libre
+        return np.where(libre, self.P, 0.)
+
+class HysteresisController(Controller):
+    # par zone : marche sous T_on, arrêt au-dessus de T_off, état conservé entre les deux ; verrou optionnel après arrêt
+    PARAMS = ("T_on", "T_off", "lockout")
+
+    def __init__(self, T_on=5., T_off=10., lockout=0.):
+        self.T_on, self.T_off, self.lockout = T_on, T_off, lockout
+
+    def reset(self, K, shape, dt):
+        super().reset(K, shape, dt)
+        self.timers = np.zeros(shape)
+        return self
+
+    def control(self, t, T, Te, dt):
+        h, timers = self.heaters, self.timers
+        np.copyto(timers, np.maximum(0, timers-dt), where=timers > 0)
+        off = h & (T > self.T_off)
+        np.copyto(timers, self.lockout, where=off)
+        h[off] = False
+        h |= (T < self.T_on) & (timers <= 0)
+        return np.where(h, self.P, 0.)
+
+class PIDController(Controller):
+    # puissance modulée P*u, u = Kp*e + Ki*∫e + Kd*de/dt borné à [0, 1], e = consigne - T [°C, h] ;
+    # intégrale gelée tant que la sortie sature (anti-emballement)
+    PARAMS = ("setpoint", "Kp", "Ki", "Kd")
+
+    def __init__(self, setpoint=10., Kp=.5, Ki=.1, Kd=0.):
+        self.setpoint, self.Kp, self.Ki, self.Kd = setpoint, Kp, Ki, Kd
+
+    def reset(self, K, shape, dt):
+        super().reset(K, shape, dt)
+        self.integral, self.e_prev = np.zeros(shape), None
+        return self
+
+    def control(self, t, T, Te, dt):
+        e = self.setpoint-T
+        d = 0. if self.e_prev is None else (e-self.e_prev)/dt
+        u = self.Kp*e+self.Ki*(self.integral+e*dt)+self.Kd*d
+        free = (u > 0) & (u < 1)
+        self.integral += np.where(free, e*dt, 0.)
+        self.e_prev = e
+        u = np.clip(u, 0., 1.)
+        self.heaters[...] = u > 0
+        return u*self.P
+
+class ScheduleController(Controller):
+    # plage horaire [h_on, h_off[ modulo period (peut passer minuit), restreinte à T_ext < T_ext_max
+    PARAMS = ("h_on", "h_off", "T_ext_max")
+
+    def __init__(self, h_on=22., h_off=7., T_ext_max=np.inf, period=24.):
+        self.h_on, self.h_off, self.T_ext_max, self.period = h_on, h_off, T_ext_max, period
+
+    def control(self, t, T, Te, dt):
+        s = t % self.period
+        inside = np.where(np.less_equal(self.h_on, self.h_off), (s >= self.h_on) & (s < self.h_off), (s >= self.h_on) | (s < self.h_off))
+        self.heaters[...] = inside & (Te < self.T_ext_max)
+        return np.where(self.heaters, self.P, 0.)
@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+import csv, io, json, os, re, zipfile
 
 def load_raw_csv(filepath):
     df = pd.read_csv(filepath, sep=";", decimal=",", engine="python")
@@ -14,6 +15,72 @@ def load_raw_csv(filepath):
     sensors = df[df.columns[3:]].to_numpy(float)
     return time, T_out, RH_out, sensors
 
+def sniff_format(filepath, sample_size=65536):
+    with open(filepath, "r", encoding="utf-8-sig", errors="replace") as f: sample = f.read(sample_size)
+    sep = csv.Sniffer().sniff(sample.split("\n", 1)[0], delimiters=";,\t").delimiter
+    body = sample.split("\n", 1)[-1]
+    decimal = "," if sep != "," and re.search(r"\d,\d", body) else "."
+    return sep, decimal
+
+def count_rows(filepath, block=1 << 24, offset=0):
+    n = 0
+    with open(filepath, "rb") as f:
+        f.seek(offset)
+        while b := f.read(block): n += b.count(b"\n")
+    return n
+
+def load_raw_csv_chunked(filepath, chunksize=200_000, sensor_dtype=np.float32, offset=0):
+    # un seul passage, moteur C, écriture directe dans des tableaux préalloués ;
+    # offset : position (octets, début de ligne) à partir de laquelle lire, l'en-tête est relu à part
+    sep, decimal = sniff_format(filepath)
+    cols = pd.read_csv(filepath, sep=sep, nrows=0, encoding="utf-8-sig").columns
+    if len(cols) < 4: raise ValueError(f"CSV invalide: {len(cols)} colonnes")
+    n = count_rows(filepath, offset=offset) + 1
+    time = np.empty(n, "datetime64[ns]"); T_out = np.empty(n); RH_out = np.empty(n)
+    sensors = np.empty((n, len(cols)-3), sensor_dtype)
+    dtype = {c: np.float64 for c in cols[1:3]} | {c: sensor_dtype for c in cols[3:]}
+    fmt, k = None, 0
+    with open(filepath, "rb") as f:
+        if offset: f.seek(offset)
+        opts = dict(header=None, names=cols) if offset else dict(encoding="utf-8-sig")
+        for chunk in pd.read_csv(f, sep=sep, decimal=decimal, engine="c", chunksize=chunksize, dtype={cols[0]: str} | dtype, **opts):
+            m = len(chunk)
+            t = pd.to_datetime(chunk[cols[0]], dayfirst=True, errors="coerce", format=fmt)
+            if fmt is None: fmt = pd.tseries.api.guess_datetime_format(chunk[cols[0]].iloc[0], dayfirst=True)
+            time[k:k+m] = t.to_numpy("datetime64[ns]")
+            T_out[k:k+m] = chunk[cols[1]].to_numpy(); RH_out[k:k+m] = chunk[cols[2]].to_numpy()
+            sensors[k:k+m] = chunk[cols[3:]].to_numpy(sensor_dtype)
+            k += m
+    return time[:k], T_out[:k], RH_out[:k], sensors[:k]
+
+def first_row_after(filepath, after, block=1 << 16):
+    # position (octets) d'un début de ligne à partir duquel toutes les lignes d'horodatage > after sont lues :
+    # recherche dichotomique dans le fichier (trié par temps), quelques lectures au lieu de tout analyser
+    sep, _ = sniff_format(filepath)
+    after = np.datetime64(after, "ns")
+    with open(filepath, "rb") as f:
+        lo, hi = len(f.readline()), os.path.getsize(filepath)
+        field = lambda line: line.decode("utf-8", "replace").split(sep, 1)[0].strip().strip('"')
+        first = f.readline()
+        if not first: return lo
+        fmt = pd.tseries.api.guess_datetime_format(field(first), dayfirst=True)
+        while hi - lo > block:
+            mid = (lo + hi) // 2
+            f.seek(mid); f.readline(); pos = f.tell(); line = f.readline()
+            t = pd.to_datetime(field(line), dayfirst=True, errors="coerce", format=fmt) if line else pd.NaT
+            if pd.isna(t) or np.datetime64(t, "ns") > after: hi = mid
+            else: lo = pos + len(line)
+    return lo
+
+def clean_time(time, *arrays):
+    # retire les NaT, trie et garde le premier de chaque horodatage en double
+    keep = np.flatnonzero(~np.isnat(time))
+    order = keep[np.argsort(time[keep], kind="stable")]
+    t = time[order]
+    first = np.concatenate([[True], t[1:] != t[:-1]]) if len(t) else np.zeros(0, bool)
+    idx = order[first]
+    return (time[idx],) + tuple(a[idx] for a in arrays)
+
 def split_sensors(sensors):
     if sensors.shape[1] != 87: raise ValueError("87 colonnes requises")
     return sensors[:,0:29], sensors[:,29:58], sensors[:,58:87]
@@ -25,10 +92,144 @@ def load_npz(filepath):
     d = np.load(filepath)
     return d["time"], d["T_out"], d["RH_out"], d["low"], d["mid"], d["top"]
 
+STORE_ARRAYS = ("time", "T_out", "RH_out", "low", "mid", "top")
+
+def save_store(dirpath, time, T_out, RH_out, low, mid, top):
+    # un .npy non compressé par tableau ; capteurs en ordre Fortran : une station = un bloc contigu dans le temps
+    os.makedirs(dirpath, exist_ok=True)
+    arrays = dict(time=np.asarray(time, "datetime64[ns]"), T_out=T_out, RH_out=RH_out,
+                  low=np.asfortranarray(low), mid=np.asfortranarray(mid), top=np.asfortranarray(top))
+    for name, a in arrays.items(): np.save(os.path.join(dirpath, name + ".npy"), a)
+    meta = {"version": 1, "rows": len(time), "arrays": {k: [str(a.dtype), list(a.shape)] for k, a in arrays.items()}}
+    with open(os.path.join(dirpath, "meta.json"), "w", encoding="utf-8") as f: json.dump(meta, f, indent=2)
+
+def npy_header(f):
+    version = np.lib.format.read_magic(f)
+    read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+    shape, fortran, dtype = read_header(f)
+    return version, shape, fortran, dtype, f.tell()
+
+def write_rows(path, rows, start=None):
+    # écrit rows à partir de la ligne start (par défaut : à la fin) d'un .npy 1D / ordre C :
+    # seuls l'en-tête et la fin du fichier sont réécrits
+    with open(path, "r+b") as f:
+        version, shape, fortran, dtype, offset = npy_header(f)
+        if fortran and len(shape) > 1: raise ValueError(f"{path}: ajout en place impossible en ordre Fortran")
+        start = shape[0] if start is None else start
+        rows = np.ascontiguousarray(rows, dtype)
+        d = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (start + len(rows),) + tuple(shape[1:])}
+        buf = io.BytesIO()
+        (np.lib.format.write_array_header_1_0 if version == (1, 0) else np.lib.format.write_array_header_2_0)(buf, d)
+        if buf.tell() == offset:
+            f.seek(0); f.write(buf.getvalue())
+            f.seek(offset + start * int(np.prod(shape[1:], dtype=int)) * dtype.itemsize)
+            f.write(rows.tobytes())
+            if f.tell() < os.path.getsize(path): f.truncate()
+            return
+    a = np.load(path)  # en-tête plus long (ancien fichier sans marge) : réécriture complète
+    np.save(path, np.concatenate([a[:start], rows]))
+
+GROWTH = 1.5
+
+def reserve_fortran(path, n, capacity):
+    # tableau 2D en ordre Fortran (une station contiguë dans le temps) : les n premières lignes recopiées
+    # station par station dans un fichier de capacity lignes (réserve à NaN), seulement quand la réserve est pleine
+    old = np.load(path, mmap_mode="r")
+    new = np.lib.format.open_memmap(path + ".tmp", "w+", old.dtype, (capacity,) + old.shape[1:], fortran_order=True)
+    for j in range(old.shape[1]):
+        new[:n, j] = old[:n, j]; new[n:, j] = np.nan
+    new.flush(); del new, old
+    os.replace(path + ".tmp", path)
+
+def write_rows_fortran(path, rows, start):
+    # écrit rows aux lignes [start, start+len(rows)[ d'un tableau Fortran à réserve : une courte écriture par
+    # station, sans toucher à l'historique ; la réserve grandit d'un facteur GROWTH quand elle est pleine
+    with open(path, "rb") as f: _, shape, fortran, dtype, offset = npy_header(f)
+    if not fortran: raise ValueError(f"{path}: ordre Fortran attendu")
+    if start + len(rows) > shape[0]: reserve_fortran(path, start, int(GROWTH*(start + len(rows))))
+    with open(path, "rb") as f: _, shape, _, _, offset = npy_header(f)
+    rows = np.asarray(rows, dtype)
+    with open(path, "r+b") as f:
+        for j in range(shape[1]):
+            f.seek(offset + (j*shape[0] + start)*dtype.itemsize); f.write(np.ascontiguousarray(rows[:, j]).tobytes())
+
+def store_rows(dirpath):
+    with open(os.path.join(dirpath, "meta.json"), encoding="utf-8") as f: return json.load(f)["rows"]
+
+def append_store(dirpath, time, T_out, RH_out, low, mid, top):
+    # ajoute des lignes postérieures à la fin du dossier .npy, sans relire ni recopier l'historique
+    # (capteurs : fichiers à réserve de lignes, meta.json["rows"] = lignes valides)
+    n = store_rows(dirpath)
+    last = np.load(os.path.join(dirpath, "time.npy"), mmap_mode="r")[n-1]
+    time = np.asarray(time, "datetime64[ns]")
+    if not len(time): return 0
+    if time[0] <= last or np.any(time[1:] <= time[:-1]):
+        raise ValueError("les lignes ajoutées doivent être triées et postérieures à la fin du stockage")
+    for name, a in dict(low=low, mid=mid, top=top).items(): write_rows_fortran(os.path.join(dirpath, name + ".npy"), a, n)
+    for name, a in dict(T_out=T_out, RH_out=RH_out, time=time).items(): write_rows(os.path.join(dirpath, name + ".npy"), a, n)
+    with open(os.path.join(dirpath, "meta.json"), encoding="utf-8") as f: meta = json.load(f)
+    meta["rows"] += len(time)
+    for v in meta["arrays"].values(): v[1][0] += len(time)
+    with open(os.path.join(dirpath, "meta.json"), "w", encoding="utf-8") as f: json.dump(meta, f, indent=2)
+    return len(time)
+
+def append_csv(filepath, dirpath, chunksize=200_000):
+    # ne lit que la fin du CSV (lignes plus récentes que le stockage) et l'ajoute au dossier .npy ;
+    # renvoie les lignes ajoutées (pour mettre à jour les rollups)
+    last = np.load(os.path.join(dirpath, "time.npy"), mmap_mode="r")[store_rows(dirpath)-1]
+    time, T_out, RH_out, sensors = load_raw_csv_chunked(filepath, chunksize, offset=first_row_after(filepath, last))
+    new = time > last
+    time, T_out, RH_out, sensors = clean_time(time[new], T_out[new], RH_out[new], sensors[new])
+    low, mid, top = split_sensors(sensors)
+    append_store(dirpath, time, T_out, RH_out, low, mid, top)
+    return time, T_out, RH_out, low, mid, top
+
+def load_store(dirpath, mmap_mode="r"):
+    # lignes valides seulement (les capteurs peuvent avoir une réserve en fin de fichier, cf. append_store)
+    n = store_rows(dirpath)
+    return tuple(np.load(os.path.join(dirpath, name + ".npy"), mmap_mode=mmap_mode)[:n] for name in STORE_ARRAYS)
+
+def store_path(path):
+    return path if os.path.isdir(path) else os.path.splitext(path)[0]
+
+def load_dataset(path, mmap_mode="r"):
+    # préfère le dossier .npy (DataSet/ à côté de DataSet.npz) s'il existe
+    d = store_path(path)
+    if os.path.isfile(os.path.join(d, "meta.json")): return load_store(d, mmap_mode)
+    return load_npz(path)
+
+def load_member(path, name, mmap_mode="r"):
+    d = store_path(path)
+    if os.path.isfile(os.path.join(d, "meta.json")): return np.load(os.path.join(d, name + ".npy"), mmap_mode=mmap_mode)[:store_rows(d)]
+    return load_npz_member(path, name, mmap_mode)
+
+def load_npz_member(filepath, name, mmap_mode="r"):
+    # un seul tableau du NPZ : memmap si le membre est stocké sans compression, sinon décompression de ce membre seulement
+    with zipfile.ZipFile(filepath) as zf:
+        info = zf.getinfo(name + ".npy")
+        if info.compress_type != zipfile.ZIP_STORED or mmap_mode is None:
+            with zf.open(info) as f: return np.lib.format.read_array(f)
+    with open(filepath, "rb") as f:
+        f.seek(info.header_offset + 26)
+        n_name, n_extra = np.frombuffer(f.read(4), "<u2")
+        f.seek(info.header_offset + 30 + int(n_name) + int(n_extra))
+        _, shape, fortran, dtype, offset = npy_header(f)
+    return np.memmap(filepath, dtype, mmap_mode, offset, shape, "F" if fortran else "C")
+
 if __name__ == "__main__":
+    import sys
+    from rollups import build_rollups, save_rollups, update_rollups
     csv_path = r"dataverse_files\DataSet.csv"
     npz_path = r"dataverse_files\DataSet.npz"
-    time, T_out, RH_out, sensors = load_raw_csv(csv_path)
+    if "--append" in sys.argv and os.path.isfile(os.path.join(store_path(npz_path), "meta.json")):
+        # mise à jour quotidienne : seules les nouvelles lignes du CSV sont lues, DataSet/ et ses rollups complétés
+        rows = append_csv(csv_path, store_path(npz_path))
+        if len(rows[0]): update_rollups(store_path(npz_path), *rows)
+        print("AJOUT:", len(rows[0]), "lignes ->", store_path(npz_path))
+        sys.exit()
+    time, T_out, RH_out, sensors = clean_time(*load_raw_csv_chunked(csv_path))
     low, mid, top = split_sensors(sensors)
     save_npz(npz_path, time, T_out, RH_out, low, mid, top)
-    print("DONE:", npz_path)
+    save_store(store_path(npz_path), time, T_out, RH_out, low, mid, top)
+    save_rollups(store_path(npz_path), build_rollups(time, T_out, RH_out, low, mid, top))
+    print("DONE:", npz_path, store_path(npz_path))
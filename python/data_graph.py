@@ -1,21 +1,55 @@
+import queue, threading
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from data_analyzer import load_npz
+from dataset import Dataset, HEIGHTS
+from rollups import LEVELS
+from decimation import minmax, band_verts, rollup_level
 import numpy as np, matplotlib
 matplotlib.use("TkAgg")
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
+from matplotlib.collections import PolyCollection
 import pandas as pd
 
-HEIGHTS = ("Low","Mid","Top")
-
 class DataGrapherApp:
-    def __init__(self, master, npz_path):
+    def __init__(self, master, npz_path, background=True):
         self.master = master
         self.master.title("Thermal Data Grapher")
-        self.time, self.T_out, self.RH_out, self.low, self.mid, self.top = load_npz(npz_path)
+        self.ds = None
+        self.lines, self.view, self.range, self.legend_loc, self._pending = {}, None, None, "best", None
         self.create_controls()
         self.create_plot_area()
+        if background: self.load_async(npz_path)
+        else: self.set_dataset(Dataset.open(npz_path))
+
+    def set_dataset(self, ds):
+        self.ds = ds
+        self.time, self.T_out = ds.time, ds.T_out
+        self.rollup_levels = [l for l in LEVELS if ds.rollup(l) is not None]
+
+    def load_async(self, path):
+        # chargement (et vérification de l'index temporel) dans un thread ; Tk n'est touché que depuis after()
+        q = queue.Queue()
+        def work():
+            try:
+                ds = Dataset.open(path, progress=lambda k, n: q.put(("progress", 100*k/(n+1))))
+                [ds.rollup(l) for l in LEVELS]
+                q.put(("done", ds))
+            except Exception as e: q.put(("error", e))
+        self.plot_button.state(["disabled"]); self.status.set("Loading data...")
+        threading.Thread(target=work, daemon=True).start()
+        self.master.after(100, self.poll_loading, q)
+
+    def poll_loading(self, q):
+        while not q.empty():
+            kind, value = q.get()
+            if kind == "progress": self.progress["value"] = value
+            elif kind == "error":
+                self.status.set("Load failed"); messagebox.showerror("Error", f"Cannot load data:\n{value}"); return
+            else:
+                self.set_dataset(value); self.progress["value"] = 100
+                self.status.set(f"{len(value)} points loaded"); self.plot_button.state(["!disabled"]); return
+        self.master.after(100, self.poll_loading, q)
 
     def create_controls(self):
         f = ttk.Frame(self.master); f.pack(side=tk.LEFT, fill=tk.Y, padx=5, pady=5)
@@ -24,12 +58,12 @@ class DataGrapherApp:
         self.height_vars = {}
         for h in HEIGHTS:
             v = tk.BooleanVar(value=(h=="Low"))
-            ttk.Checkbutton(hf, text=h, variable=v).pack(anchor="w")
+            ttk.Checkbutton(hf, text=h, variable=v, command=self.on_selection).pack(anchor="w")
             self.height_vars[h] = v
 
         ef = ttk.LabelFrame(f, text="External"); ef.pack(fill=tk.X, pady=5)
         self.var_Text = tk.BooleanVar(value=False)
-        ttk.Checkbutton(ef, text="T_ext", variable=self.var_Text).pack(anchor="w")
+        ttk.Checkbutton(ef, text="T_ext", variable=self.var_Text, command=self.on_selection).pack(anchor="w")
 
         sf = ttk.LabelFrame(f, text="Stations"); sf.pack(fill=tk.BOTH, expand=True, pady=5)
         self.station_listbox = tk.Listbox(sf, selectmode=tk.MULTIPLE, exportselection=False, height=10)
@@ -38,6 +72,7 @@ class DataGrapherApp:
         sb.pack(side=tk.RIGHT, fill=tk.Y)
         self.station_listbox.configure(yscrollcommand=sb.set)
         for i in range(1,30): self.station_listbox.insert(tk.END, f"S{i}")
+        self.station_listbox.bind("<<ListboxSelect>>", lambda e: self.on_selection())
 
         tf = ttk.LabelFrame(f, text="Time range (optional)"); tf.pack(fill=tk.X, pady=5)
         ttk.Label(tf, text="Start:").grid(row=0, column=0, sticky="e")
@@ -48,9 +83,15 @@ class DataGrapherApp:
         ttk.Label(tf, text="Format ex.: 2025-11-01 12:00").grid(row=2, column=0, columnspan=2, pady=2)
 
         bf = ttk.Frame(f); bf.pack(fill=tk.X, pady=5)
-        ttk.Button(bf, text="Plot", command=self.update_plot).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=2)
+        self.plot_button = ttk.Button(bf, text="Plot", command=self.update_plot)
+        self.plot_button.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=2)
         ttk.Button(bf, text="Save figure", command=self.save_figure).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=2)
 
+        self.status = tk.StringVar(value="")
+        self.progress = ttk.Progressbar(f, mode="determinate", maximum=100)
+        self.progress.pack(fill=tk.X, pady=(5, 0))
+        ttk.Label(f, textvariable=self.status).pack(anchor="w")
+
     def create_plot_area(self):
         pf = ttk.Frame(self.master); pf.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
         self.fig, self.ax = plt.subplots(figsize=(8,4))
@@ -67,56 +108,146 @@ class DataGrapherApp:
         sel = self.station_listbox.curselection()
         return [i+1 for i in sel] if sel else []
 
-    def get_time_mask(self):
-        t = self.time; m = np.ones(t.shape[0], dtype=bool)
+    def get_time_slice(self):
         s = self.entry_start.get().strip(); e = self.entry_end.get().strip()
+        st = et = None
         if s:
             st = pd.to_datetime(s, errors="coerce")
             if pd.isna(st): messagebox.showerror("Error", f"Cannot parse start time: {s}"); return None
-            m &= t >= np.datetime64(st)
         if e:
             et = pd.to_datetime(e, errors="coerce")
             if pd.isna(et): messagebox.showerror("Error", f"Cannot parse end time: {e}"); return None
-            m &= t <= np.datetime64(et)
-        if not m.any(): messagebox.showwarning("Warning", "No data points in selected time range."); return None
-        return m
+        sl = self.ds.index(st, et)
+        if sl.start == sl.stop: messagebox.showwarning("Warning", "No data points in selected time range."); return None
+        return sl
 
     def get_array_for_height(self, h):
-        if h=="Low": return self.low
-        if h=="Mid": return self.mid
-        if h=="Top": return self.top
-        raise ValueError("Unknown height")
+        return self.ds.height(h)
+
+    def series(self, key, t0, t1, margin=.25):
+        # [t0, t1] élargi de margin x la largeur de vue ; (t, y, None) si peu de points, sinon enveloppe
+        # min / max par pixel (t, min, max) : min / max des rollups quand un pixel couvre au moins un intervalle
+        field, s = key
+        span = t1 - t0; t0, t1 = t0 - margin*span, t1 + margin*span
+        n_px = int((1 + 2*margin) * max(self.ax.bbox.width, 100))
+        lvl = rollup_level(span*(1 + 2*margin), n_px, self.rollup_levels)
+        if lvl:
+            r = self.ds.rollup(lvl).window(t0 - LEVELS[lvl], t1)
+            if len(r.time):
+                d = r.data["T_out" if field == "T_out" else field.lower()]
+                lo, hi = (d["min"], d["max"]) if field == "T_out" else (d["min"][:, s-1], d["max"][:, s-1])
+                return minmax(r.time, lo, hi, n_px) or (r.time, lo, hi)
+        sl = self.ds.index(t0, t1)
+        t, a = self.time[sl], (self.T_out if field == "T_out" else self.get_array_for_height(field)[:, s-1])[sl]
+        return minmax(t, a, n_px=n_px) or (t, a, None)
+
+    def add_series(self, key, t0, t1, **kw):
+        line, = self.ax.plot([t0, t1], [np.nan, np.nan], **kw)
+        band = PolyCollection([], facecolor=line.get_color(), edgecolor=line.get_color(), linewidth=.5)
+        self.ax.add_collection(band, autolim=False)
+        self.lines[key] = (line, band)
+        return self.set_series(key, t0, t1)
 
-    def update_plot(self):
+    def set_series(self, key, t0, t1):
+        # courbe brute si peu de points par pixel, sinon bande min / max (la ligne reste pour la légende)
+        line, band = self.lines[key]
+        t, lo, hi = self.series(key, t0, t1)
+        if hi is None: line.set_data(t, lo); band.set_verts([])
+        else: line.set_data([], []); band.set_verts(band_verts(mdates.date2num(t), lo, hi))
+        return lo, (lo if hi is None else hi)
+
+    def on_xlim(self, ax):
+        # zoom / déplacement depuis la barre d'outils : nouvelle décimation une fois le geste terminé
+        if self._pending: self.master.after_cancel(self._pending)
+        self._pending = self.master.after(50, self.redecimate)
+
+    def redecimate(self):
+        self._pending = None
+        if not self.lines: return
+        x0, x1 = (np.datetime64(mdates.num2date(x).replace(tzinfo=None), "ns") for x in self.ax.get_xlim())
+        if (x0, x1) == self.view: return
+        self.view = (x0, x1)
+        for key in self.lines: self.set_series(key, x0, x1)
+        self.canvas.draw_idle()
+
+    def selected_series(self, H, S):
+        series = {(h, s): dict(label=f"{h}-S{s}") for h in H for s in S}
+        if self.var_Text.get(): series[("T_out", 0)] = dict(label="T_ext", linewidth=2.5)
+        return series
+
+    def on_selection(self):
+        # cocher / décocher une hauteur, une station ou T_ext sur un graphe existant :
+        # seules les courbes ajoutées ou retirées sont traitées (même après avoir tout décoché)
+        if self.view is not None: self.update_plot(quiet=True)
+
+    def update_plot(self, quiet=False):
+        if self.ds is None: return
         H = self.get_selected_heights()
         S = self.get_selected_stations()
-        M = self.get_time_mask()
+        series = self.selected_series(H, S)
+        if quiet: return self.update_series(series)
+        M = self.get_time_slice()
         if M is None: return
         if not H and not self.var_Text.get():
             messagebox.showerror("Error","Select at least one height or T_ext."); return
         if not S and not self.var_Text.get():
             messagebox.showerror("Error","Select at least one station or T_ext."); return
 
-        self.ax.clear()
-        t = self.time[M]
+        t0, t1 = self.time[M.start], self.time[M.stop-1]
+        if self.lines and (t0, t1) == self.range: return self.update_series(series)
 
-        for h in H:
-            arr = self.get_array_for_height(h)
-            for s in S:
-                self.ax.plot(t, arr[M, s-1], label=f"{h}-S{s}")
+        self.ax.clear(); self.lines = {}
+        self.range = self.view = (t0, t1)
 
-        if self.var_Text.get():
-            self.ax.plot(t, self.T_out[M], label="T_ext", linewidth=2.5)
+        ext = []
+        for key, kw in series.items():
+            ext += self.add_series(key, t0, t1, **kw)
+        # les bandes (collections) ne comptent pas dans l'autoscale : limites y à partir des enveloppes
+        lo, hi = np.fmin.reduce(np.concatenate(ext[0::2])), np.fmax.reduce(np.concatenate(ext[1::2]))
+        self.ax.set_xlim(t0, t1)
+        if np.isfinite(lo) and np.isfinite(hi) and hi > lo: self.ax.set_ylim(lo - .05*(hi-lo), hi + .05*(hi-lo))
+        self.ax.callbacks.connect("xlim_changed", self.on_xlim)
 
         self.ax.set_xlabel("Temps", fontsize=18, fontweight="bold")
         self.ax.set_ylabel("Température [°C]", fontsize=18, fontweight="bold")
         self.ax.tick_params(axis="both", labelsize=15)
-        self.ax.legend(fontsize=14, frameon=True)
+        self.ax.legend(fontsize=14, frameon=True, framealpha=1)
         self.ax.xaxis.set_major_locator(mdates.AutoDateLocator(maxticks=12))
         self.ax.xaxis.set_major_formatter(mdates.DateFormatter("%Y-%m-%d"))
         self.fig.autofmt_xdate()
         self.ax.grid(True)
         self.canvas.draw()
+        # loc="best" parcourt tous les sommets à chaque dessin : position calculée une fois puis figée
+        leg = self.ax.get_legend()
+        self.legend_loc = tuple(self.ax.transAxes.inverted().transform(leg.get_window_extent())[0])
+        leg.set_loc(self.legend_loc)
+
+    def update_series(self, series):
+        # artistes réutilisés par (hauteur, station) : on retire / ajoute seulement ceux dont la sélection a changé
+        removed = [k for k in self.lines if k not in series]
+        added = [k for k in series if k not in self.lines]
+        if not removed and not added: return
+        for k in removed:
+            for a in self.lines.pop(k): a.remove()
+        ext = []
+        for k in added: ext += self.add_series(k, *self.view, **series[k])
+        y0, y1 = self.ax.get_ylim()
+        lo = np.fmin.reduce(np.concatenate(ext[0::2])) if ext else y0
+        hi = np.fmax.reduce(np.concatenate(ext[1::2])) if ext else y1
+        inside = not (lo < y0 or hi > y1)  # NaN : rien à afficher, considéré dans les limites
+        if self.lines: self.ax.legend(fontsize=14, frameon=True, framealpha=1, loc=self.legend_loc)
+        elif self.ax.get_legend() is not None: self.ax.get_legend().remove()  # plus rien de sélectionné
+        if removed or not inside:
+            if not inside: self.ax.set_ylim(min(lo, y0) - .05*(max(hi, y1)-min(lo, y0)), max(hi, y1) + .05*(max(hi, y1)-min(lo, y0)))
+            self.canvas.draw_idle()
+            return
+        # ajout seul, dans les limites : nouvelles courbes puis légende (opaque, même coin, plus grande
+        # que l'ancienne qu'elle recouvre) dessinées par-dessus l'image existante, copie de l'axe seulement
+        for k in added:
+            line, band = self.lines[k]
+            self.ax.draw_artist(band); self.ax.draw_artist(line)
+        self.ax.draw_artist(self.ax.get_legend())
+        self.canvas.blit(self.ax.bbox)
 
     def save_figure(self):
         ft = [("PNG","*.png"),("PDF","*.pdf"),("SVG","*.svg"),("All files","*.*")]
@@ -0,0 +1,81 @@
+import os, numpy as np, pandas as pd
+from data_analyzer import load_dataset, load_member, store_path, STORE_ARRAYS
+from rollups import LEVELS, load_rollup, levels_for_window
+
+HEIGHTS = ("Low", "Mid", "Top")
+N_STATIONS = 29
+
+def to_datetime64(x):
+    return None if x is None else np.datetime64(pd.Timestamp(x), "ns")
+
+def check_time_index(time):
+    if not np.issubdtype(time.dtype, np.datetime64): raise ValueError(f"time doit être datetime64, pas {time.dtype}")
+    nat = np.isnat(time)
+    if nat.any(): raise ValueError(f"{nat.sum()} horodatages manquants (NaT), premier à l'indice {np.argmax(nat)}")
+    d = np.diff(time.view("i8"))
+    if (d < 0).any(): raise ValueError(f"temps non croissant à l'indice {np.argmax(d < 0)+1}")
+    if (d == 0).any(): raise ValueError(f"{(d == 0).sum()} horodatages en double, premier à l'indice {np.argmax(d == 0)+1}")
+
+class Dataset:
+    # tableaux (éventuellement memmap) + index temporel trié ; window() renvoie des vues sans copie
+    def __init__(self, time, T_out, RH_out, low, mid, top, check=True, path=None):
+        if check: check_time_index(time)
+        self.time, self.T_out, self.RH_out, self.low, self.mid, self.top = time, T_out, RH_out, low, mid, top
+        self.path, self._rollups = path, {}
+
+    @classmethod
+    def open(cls, path=r"dataverse_files\DataSet.npz", mmap_mode="r", progress=None):
+        # progress(k, n) : appelé après chaque tableau chargé (barre de progression du GUI)
+        d = store_path(path)
+        if progress is None: arrays = load_dataset(path, mmap_mode)
+        else:
+            arrays = []
+            for k, name in enumerate(STORE_ARRAYS):
+                arrays.append(load_member(path, name, mmap_mode)); progress(k+1, len(STORE_ARRAYS))
+        try:
+            return cls(*arrays, path=d if os.path.isdir(d) else None)
+        except ValueError as e:
+            # DataSet.npz d'une version antérieure (temps lu avec errors="coerce", pas nettoyé)
+            raise ValueError(f"{path} : {e}. Relancer data_analyzer.py pour nettoyer le temps "
+                             "(NaT retirés, tri, doublons supprimés) et réenregistrer les données.") from e
+
+    def rollup(self, level):
+        # agrégats précalculés (rollups.py) du dossier DataSet/, None s'ils n'existent pas
+        if level not in self._rollups: self._rollups[level] = load_rollup(self.path, level) if self.path else None
+        return self._rollups[level]
+
+    def rollup_for(self, window, start=None, end=None):
+        # équivalent de resample(window).mean() sur window(start, end) ; None si aucun niveau ne couvre
+        # exactement les données de l'intervalle (on retombe alors sur les données brutes)
+        sl = self.index(start, end)
+        if sl.start == sl.stop: return None
+        t0, t1 = self.time[sl.start], self.time[sl.stop-1]
+        for lvl in levels_for_window(window):
+            r = self.rollup(lvl)
+            if r is None: continue
+            a = np.searchsorted(r.time, t0, "right")-1; b = np.searchsorted(r.time, t1, "right")
+            if a < 0 or r.time[a] < t0.astype("datetime64[D]"): continue
+            if sl.start > 0 and self.time[sl.start-1] >= r.time[a]: continue
+            if sl.stop < len(self.time) and self.time[sl.stop] < r.time[b-1]+LEVELS[lvl]: continue
+            return r.slice(a, b).coarsen(window)
+        return None
+
+    def __len__(self): return len(self.time)
+
+    def index(self, start=None, end=None):
+        # bornes incluses, comme (time >= start) & (time <= end)
+        a = 0 if start is None else int(np.searchsorted(self.time, to_datetime64(start), "left"))
+        b = len(self.time) if end is None else int(np.searchsorted(self.time, to_datetime64(end), "right"))
+        return slice(a, max(a, b))
+
+    def window(self, start=None, end=None):
+        s = self.index(start, end)
+        d = Dataset(self.time[s], self.T_out[s], self.RH_out[s], self.low[s], self.mid[s], self.top[s], check=False, path=self.path)
+        d._rollups = self._rollups
+        return d
+
+    def height(self, h):
+        if h == "Low": return self.low
+        if h == "Mid": return self.mid
+        if h == "Top": return self.top
+        raise ValueError("Unknown height")
@@ -0,0 +1,35 @@
+import numpy as np
+from rollups import LEVELS
+from intervals import runs
+
+def pixel_starts(t, n_px, t0=None, t1=None):
+    # premier échantillon de chaque colonne de pixels (intervalles de temps égaux sur [t0, t1]), colonnes vides ignorées
+    t0 = t[0] if t0 is None else t0; t1 = t[-1] if t1 is None else t1
+    edges = t0 + np.arange(n_px) * ((t1 - t0) / n_px)
+    s = np.searchsorted(t, edges)
+    s = s[s < len(t)]
+    return s[np.r_[True, s[1:] != s[:-1]]] if len(s) else s
+
+def minmax(t, lo, hi=None, n_px=1000):
+    # enveloppe min / max par colonne de pixels : (t, min, max), None s'il y a déjà moins de 2 points par pixel.
+    # Les extrêmes restent visibles quel que soit le zoom ; une colonne entièrement NaN reste NaN.
+    # lo, hi : (n,) ou (n, k) ; hi = lo pour des données brutes, min / max des rollups sinon.
+    hi = lo if hi is None else hi
+    if len(t) <= 2 * n_px: return None
+    s = pixel_starts(t, n_px)
+    return t[s], np.fmin.reduceat(lo, s, axis=0), np.fmax.reduceat(hi, s, axis=0)
+
+def band_verts(x, lo, hi):
+    # polygones de la bande lo..hi (x numérique, ex. mdates.date2num), coupés aux colonnes NaN.
+    # Plusieurs échantillons par pixel : une courbe brute remplit la colonne de min à max,
+    # remplir la bande donne le même rendu qu'un zigzag min / max pour une fraction du coût de tracé Agg.
+    ok = ~(np.isnan(lo) | np.isnan(hi))
+    return [np.r_[np.column_stack([x[a:b], hi[a:b]]), np.column_stack([x[a:b], lo[a:b]])[::-1]]
+            for a, b in zip(*runs(ok))]
+
+def rollup_level(span, n_px, available):
+    # niveau de rollup le plus grossier dont le pas tient dans un pixel, None : données brutes
+    lvl = None
+    for name, w in LEVELS.items():
+        if name in available and w * n_px <= span: lvl = name
+    return lvl
@@ -0,0 +1,69 @@
+import hashlib, json, numpy as np
+from collections import OrderedDict
+
+_CACHE = OrderedDict()
+CACHE_SIZE = 16
+
+def harmonics(q):
+    # terme principal (A, t0, phi) + "harmoniques" optionnelles, ex. journalière + saisonnière
+    h = [(q["A"], q["t0"], q.get("phi", 0.0))]
+    h += [(c["A"], c["t0"], c.get("phi", 0.0)) for c in q.get("harmoniques", [])]
+    return q["T_mean"], tuple(h)
+
+def eval_harmonics(t, T_mean, h):
+    out = T_mean
+    for A, t0, phi in h: out = out + A*np.cos(2*np.pi*(t-phi)/t0)
+    return out
+
+def grid_key(time):
+    time = np.ascontiguousarray(time, float)
+    return (len(time), hashlib.blake2b(time.tobytes(), digest_size=16).hexdigest())
+
+def cached(key, compute):
+    if key in _CACHE:
+        _CACHE.move_to_end(key); return _CACHE[key]
+    val = compute()
+    for a in val: a.flags.writeable = False
+    _CACHE[key] = val
+    if len(_CACHE) > CACHE_SIZE: _CACHE.popitem(last=False)
+    return val
+
+class HarmonicForcing:
+    def __init__(self, p):
+        if hasattr(p, "ext"): self.ext, self.sol = p.ext, p.sol
+        else: self.ext, self.sol = harmonics(p["temperature_exterieure"]), harmonics(p["temperature_sol"])
+        self.key = json.dumps([self.ext, self.sol])
+
+    def T_ext(self, t): return eval_harmonics(t, *self.ext)
+    def T_sol(self, t): return eval_harmonics(t, *self.sol)
+
+    def on_grid(self, time):
+        time = np.asarray(time, float)
+        return cached((self.key, grid_key(time)), lambda: (self.T_ext(time), self.T_sol(time)))
+
+def forcing_from(p, bc=None):
+    return bc if bc is not None else HarmonicForcing(p)
+
+class MeasuredForcing:
+    # T_ext mesurée (DataSet.npz) projetée sur la grille de simulation, t = heures depuis start
+    def __init__(self, p, npz_path=r"dataverse_files\DataSet.npz", start=None, end=None):
+        from data_analyzer import load_member
+        time = load_member(npz_path, "time")
+        a = 0 if start is None else np.searchsorted(time, np.datetime64(start))
+        b = len(time) if end is None else np.searchsorted(time, np.datetime64(end), "right")
+        if b <= a: raise ValueError("Aucune mesure dans l'intervalle demandé")
+        t = np.asarray(time[a:b]); T = np.asarray(load_member(npz_path, "T_out")[a:b], float)
+        ok = ~np.isnan(T) & ~np.isnat(t)
+        if not ok.any(): raise ValueError("T_out entièrement manquante dans l'intervalle")
+        self.start = t[ok][0]
+        self.t = (t[ok]-self.start)/np.timedelta64(1, "h"); self.T = T[ok]
+        self.duration = float(self.t[-1])
+        self.sol = HarmonicForcing(p).sol
+        self.key = json.dumps([str(npz_path), str(self.start), self.duration, len(self.t), self.sol])
+
+    def T_ext(self, t): return np.interp(t, self.t, self.T)
+    def T_sol(self, t): return eval_harmonics(t, *self.sol)
+
+    def on_grid(self, time):
+        time = np.asarray(time, float)
+        return cached((self.key, grid_key(time)), lambda: (self.T_ext(time), self.T_sol(time)))
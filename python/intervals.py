@@ -0,0 +1,29 @@
+import numpy as np
+import matplotlib.dates as mdates
+from matplotlib.collections import PolyCollection
+
+def runs(mask):
+    # plages consécutives de True : indices (début, fin) avec fin exclue, en un passage diff / flatnonzero
+    edges = np.flatnonzero(np.diff(np.r_[0, np.asarray(mask).astype(np.int8), 0]))
+    return edges[0::2], edges[1::2]
+
+def time_spans(t, mask):
+    # plages temporelles où mask est vrai : de t[début] jusqu'au premier échantillon hors plage
+    # (dernier échantillon si la plage va jusqu'au bout)
+    a, b = runs(mask)
+    return t[a], t[np.minimum(b, len(t)-1)]
+
+def daily_spans(start, end, h0, h1):
+    # plages [jour+h0, jour+h1] (h1 > 24 : lendemain) pour chaque jour de [start, end[, ex. la nuit 22h–7h
+    days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "m"), np.timedelta64(1, "D")).astype("datetime64[m]")
+    return days+np.timedelta64(int(h0*60), "m"), days+np.timedelta64(int(h1*60), "m")
+
+def shade(ax, x0, x1, **kw):
+    # bandes verticales sur toute la hauteur des axes, comme axvspan, mais une seule collection pour toutes les plages
+    x0, x1 = mdates.date2num(x0), mdates.date2num(x1)
+    verts = np.stack([np.column_stack([x0, np.zeros_like(x0)]), np.column_stack([x0, np.ones_like(x0)]),
+                      np.column_stack([x1, np.ones_like(x1)]), np.column_stack([x1, np.zeros_like(x1)])], axis=1)
+    c = PolyCollection(verts, transform=ax.get_xaxis_transform(), linewidths=0, **kw)
+    ax.add_collection(c, autolim=False)
+    if len(x0): ax.update_datalim([(x0.min(), 0), (x1.max(), 0)], updatey=False); ax.autoscale_view(scaley=False)
+    return c
@@ -0,0 +1,87 @@
+import os, numpy as np
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from simulation_thermique import load_parameters, simulate_batch
+
+METRICS = ("T_mean", "T_min", "T_max", "heater_hours", "heater_kWh")
+PERCENTILES = (5, 50, 95)
+
+def sample(dist, rng, n):
+    kind, *a = dist
+    if kind == "uniform": return rng.uniform(a[0], a[1], n)
+    if kind == "normal": return rng.normal(a[0], a[1], n)
+    if kind == "lognormal": return rng.lognormal(np.log(a[0]), a[1], n)
+    if kind == "triangular": return rng.triangular(a[0], a[1], a[2], n)
+    raise ValueError(f"distribution inconnue: {kind}")
+
+def hist_ranges(p, t_end):
+    P = sum(v for k, v in p["chauffage"].items() if not k.startswith("__"))
+    return {"T_mean": (-100., 150.), "T_min": (-100., 150.), "T_max": (-100., 150.),
+            "heater_hours": (0., t_end), "heater_kWh": (0., 2*P*t_end/1000)}
+
+class StatsAccumulator:
+    # moments par fusion de Chan, extrêmes et histogramme fixe -> percentiles en mémoire constante
+    def __init__(self, lo, hi, n_zones=6, bins=25000):
+        self.lo, self.hi, self.bins = lo, hi, bins
+        self.n = 0; self.mean = np.zeros(n_zones); self.m2 = np.zeros(n_zones)
+        self.min = np.full(n_zones, np.inf); self.max = np.full(n_zones, -np.inf)
+        self.hist = np.zeros((n_zones, bins), np.int64)
+
+    def update(self, x):
+        nb = len(x)
+        if nb == 0: return
+        mb = x.mean(0); m2b = ((x-mb)**2).sum(0); d = mb-self.mean; n = self.n+nb
+        self.mean = self.mean+d*nb/n; self.m2 = self.m2+m2b+d**2*self.n*nb/n; self.n = n
+        np.minimum(self.min, x.min(0), out=self.min); np.maximum(self.max, x.max(0), out=self.max)
+        idx = np.clip(((x-self.lo)/(self.hi-self.lo)*self.bins).astype(int), 0, self.bins-1)
+        for z in range(x.shape[1]): self.hist[z] += np.bincount(idx[:, z], minlength=self.bins)
+
+    def percentile(self, q):
+        c = np.cumsum(self.hist, 1); k = np.argmax(c >= q/100*self.n, 1)
+        return self.lo+(k+.5)*(self.hi-self.lo)/self.bins
+
+    def result(self):
+        r = {"mean": self.mean, "std": np.sqrt(self.m2/max(self.n-1, 1)), "min": self.min, "max": self.max}
+        for q in PERCENTILES: r[f"p{q}"] = self.percentile(q)
+        return r
+
+def run_shard(p, distributions, seed, n, dt, t_end):
+    rng = np.random.default_rng(seed)
+    overrides = {k: sample(d, rng, n) for k, d in distributions.items()}
+    _, stats = simulate_batch(p, overrides, dt, t_end)
+    return {m: stats[m] for m in METRICS}
+
+def run_monte_carlo(p, distributions, n_samples, seed=0, dt=1/60, t_end=48, shard_size=1000, workers=None):
+    # une graine fille par tranche : le résultat ne dépend pas du nombre de cœurs
+    workers = workers or os.cpu_count()
+    n_shards = -(-n_samples//shard_size)
+    seeds = np.random.SeedSequence(seed).spawn(n_shards)
+    ranges = hist_ranges(p, t_end)
+    acc = {m: StatsAccumulator(*ranges[m]) for m in METRICS}
+    pending, done, nxt = {}, {}, 0
+    with ProcessPoolExecutor(workers) as ex:
+        for s in range(n_shards):
+            n = min(shard_size, n_samples-s*shard_size)
+            pending[ex.submit(run_shard, p, distributions, seeds[s], n, dt, t_end)] = s
+            while len(pending) >= 2*workers or (s == n_shards-1 and pending):
+                fin, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for f in fin: done[pending.pop(f)] = f.result()
+                while nxt in done:
+                    r = done.pop(nxt); nxt += 1
+                    for m in METRICS: acc[m].update(r[m])
+    return {m: a.result() for m, a in acc.items()}
+
+if __name__ == "__main__":
+    p = load_parameters()
+    prop, g = p["proprietes"], p["infiltration"]
+    distributions = {
+        "proprietes.k_ciment": ("uniform", .8*prop["k_ciment"], 1.2*prop["k_ciment"]),
+        "proprietes.k_isolant": ("lognormal", prop["k_isolant"], .2),
+        "proprietes.h_int": ("triangular", 5, prop["h_int"], 15),
+        "proprietes.h_ext": ("triangular", 15, prop["h_ext"], 45),
+        "infiltration.gap_3": ("normal", g["gap_3"], .1*abs(g["gap_3"])),
+    }
+    res = run_monte_carlo(p, distributions, 2000, seed=42, dt=1/60, t_end=48)
+    for m, r in res.items():
+        print(f"\n=== {m} ===")
+        for i in range(6):
+            print(f"Zone {i+1} : moy {r['mean'][i]:.2f}  p5 {r['p5'][i]:.2f}  p95 {r['p95'][i]:.2f}  min {r['min'][i]:.2f}")
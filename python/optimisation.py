@@ -0,0 +1,124 @@
+import hashlib, json, os, numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from simulation_thermique import load_parameters, simulate_batch
+from parametres import as_parameters, N_ZONES
+from controllers import ThresholdController
+
+# réglage de la règle des aérothermes (compute_Q_aerotherme / ThresholdController) : seuils, verrou et
+# puissance par zone qui minimisent l'énergie en gardant toutes les zones au-dessus d'un plancher
+
+CONTROL = ("T_ext_on", "Tm_max", "lockout")
+# règle actuelle : réglages par défaut du contrôleur, point de comparaison et de départ de la recherche
+CURRENT = {n: getattr(ThresholdController(), n) for n in CONTROL}
+
+def default_bounds(p, power=(0., 2.)):
+    # seuils en °C, verrou en h, puissances en multiples de celles du JSON
+    b = {"T_ext_on": (-8., 3.), "Tm_max": (20., 45.), "lockout": (0., 1.)}
+    for i in range(1, N_ZONES+1):
+        P = p["chauffage"][f"p{i}"]; b[f"chauffage.p{i}"] = (power[0]*P, power[1]*P)
+    return b
+
+def current_point(p, names):
+    return np.array([CURRENT[n] if n in CONTROL else p["chauffage"][n.split(".")[1]] for n in names], float)
+
+def map_shards(fn, X, args=(), workers=None, executor=None, min_shard=16):
+    # fn(X[tranche], *args) -> (n, ...) : une tranche vectorisée par cœur (au moins min_shard lignes chacune)
+    workers = workers or os.cpu_count()
+    parts = np.array_split(X, max(1, min(workers, len(X)//min_shard)))
+    if len(parts) == 1: return fn(parts[0], *args)
+    jobs = [[a]*len(parts) for a in args]
+    if executor is not None: return np.concatenate(list(executor.map(fn, parts, *jobs)))
+    with ProcessPoolExecutor(workers) as ex: return np.concatenate(list(ex.map(fn, parts, *jobs)))
+
+def run_candidates(X, p, names, dt, t_end):
+    # un lot vectorisé : réglages de la règle en (N, 1), puissances en overrides chauffage.pN
+    X = np.atleast_2d(X); N = len(X)
+    ctl = ThresholdController(**{n: X[:, k:k+1] for k, n in enumerate(names) if n in CONTROL})
+    overrides = {f"chauffage.p{i}": np.full(N, float(p["chauffage"][f"p{i}"])) for i in range(1, N_ZONES+1)}
+    overrides.update({n: X[:, k] for k, n in enumerate(names) if n not in CONTROL})
+    _, s = simulate_batch(p, overrides, dt, t_end, controller=ctl)
+    return np.column_stack([s["heater_kWh"].sum(1), s["T_min"].min(1), s["cycles"].sum(1)])
+
+class EvalCache:
+    # résultats (kWh, T_min, démarrages) par empreinte du candidat : une réévaluation est gratuite ;
+    # path : fichier JSON conservé d'une session à l'autre
+    def __init__(self, path=None):
+        self.path, self.data = path, {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f: self.data = json.load(f)
+
+    def save(self):
+        if self.path:
+            with open(self.path, "w", encoding="utf-8") as f: json.dump(self.data, f)
+
+def candidate_keys(p, names, X, dt, t_end):
+    base = hashlib.blake2b(digest_size=16)
+    base.update(as_parameters(p).key.encode()); base.update(json.dumps([list(names), dt, t_end]).encode())
+    keys = []
+    for x in np.atleast_2d(np.asarray(X, float)):
+        h = base.copy(); h.update(x.tobytes()); keys.append(h.hexdigest())
+    return keys
+
+def evaluate(p, names, X, dt=1/60, t_end=168, cache=None, workers=None, executor=None):
+    # (N, 3) : kWh totaux, T_min toutes zones, démarrages ; seuls les candidats absents du cache sont simulés
+    X = np.atleast_2d(np.asarray(X, float))
+    cache = cache if cache is not None else EvalCache()
+    keys = candidate_keys(p, names, X, dt, t_end)
+    todo, seen = [], set()
+    for i, k in enumerate(keys):
+        if k not in cache.data and k not in seen: seen.add(k); todo.append(i)
+    if todo:
+        R = map_shards(run_candidates, X[todo], (p, names, dt, t_end), workers, executor)
+        for i, row in zip(todo, R): cache.data[keys[i]] = row.tolist()
+    return np.array([cache.data[k] for k in keys])
+
+def penalized(R, floor, penalty=1e3, cycle_cost=0.):
+    # énergie + pénalité par °C sous le plancher (+ cycle_cost kWh par démarrage pour limiter le battement)
+    return R[:, 0]+penalty*np.maximum(0., floor-R[:, 1])+cycle_cost*R[:, 2]
+
+def minimize_cem(f, lo, hi, pop=64, elite=.2, iters=15, seed=0, x0=None, smoothing=.7):
+    # méthode d'entropie croisée : population gaussienne bornée, recentrée sur les meilleurs à chaque génération ;
+    # f évalue toute la population d'un coup (N, d) -> (N,)
+    lo, hi = np.asarray(lo, float), np.asarray(hi, float)
+    rng = np.random.default_rng(seed)
+    mu = .5*(lo+hi) if x0 is None else np.asarray(x0, float); sd = .5*(hi-lo)
+    n_elite = max(2, int(elite*pop))
+    best_x, best_y, history = None, np.inf, []
+    for it in range(iters):
+        X = np.clip(rng.normal(mu, sd, (pop, len(lo))), lo, hi)
+        if it == 0 and x0 is not None: X[0] = x0
+        y = f(X)
+        order = np.argsort(y); E = X[order[:n_elite]]
+        if y[order[0]] < best_y: best_x, best_y = X[order[0]].copy(), y[order[0]]
+        mu = E.mean(0); sd = smoothing*sd+(1-smoothing)*E.std(0)
+        history.append(best_y)
+    return best_x, best_y, history
+
+def optimize_control(p, names=None, floor=0., dt=1/60, t_end=168, bounds=None, pop=64, iters=15,
+                     penalty=1e3, cycle_cost=0., seed=0, workers=None, cache=None):
+    names = list(names or CONTROL)
+    bounds = {**default_bounds(p), **(bounds or {})}
+    lo, hi = np.array([bounds[n][0] for n in names]), np.array([bounds[n][1] for n in names])
+    cache = cache if cache is not None else EvalCache()
+    workers = workers or os.cpu_count()
+    # un seul groupe de processus pour toutes les générations
+    ex = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        f = lambda X: penalized(evaluate(p, names, X, dt, t_end, cache, workers, executor=ex), floor, penalty, cycle_cost)
+        x0 = np.clip(current_point(p, names), lo, hi)
+        x, y, history = minimize_cem(f, lo, hi, pop, iters=iters, seed=seed, x0=x0)
+        R = evaluate(p, names, np.vstack([x0, x]), dt, t_end, cache, workers, executor=ex)
+    finally:
+        if ex is not None: ex.shutdown()
+    cache.save()
+    return {"params": dict(zip(names, x)), "kWh": R[1, 0], "T_min": R[1, 1], "cycles": R[1, 2],
+            "current": {"params": dict(zip(names, x0)), "kWh": R[0, 0], "T_min": R[0, 1], "cycles": R[0, 2]},
+            "objective": y, "history": history}
+
+if __name__ == "__main__":
+    p = load_parameters()
+    names = list(CONTROL)+[f"chauffage.p{i}" for i in range(1, N_ZONES+1)]
+    res = optimize_control(p, names, floor=0., t_end=72, cycle_cost=.1, cache=EvalCache("optimisation_cache.json"))
+    for label, r in (("Règle actuelle", res["current"]), ("Optimum", res)):
+        print(f"\n=== {label} : {r['kWh']:.1f} kWh, T_min {r['T_min']:.2f} °C, {r['cycles']:.0f} démarrages ===")
+        for n, v in r["params"].items(): print(f"{n:14s} {v:10.3f}")
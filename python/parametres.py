@@ -0,0 +1,149 @@
+import hashlib, json, numpy as np
+from dataclasses import dataclass, field, fields
+from functools import lru_cache
+from calcul_resistance_flux import check_positive, resistance_vers_exterieur_vec, resistance_vers_sol_vec
+from forcage import harmonics
+
+N_ZONES = 6
+ARRAYS = ("C", "R_ext", "R_sol", "G_inf", "P", "G_on", "G_off", "ei", "ej", "A_plaque", "A_ciment", "V")
+
+def zone_geometry(g):
+    # mêmes formules que JSON/calcul.py : plaque = dessus, ciment = 2 parois + fond (+ paroi d'about en p1/p6)
+    W, H = g["pi_y"]*g["scale_y"], g["pi_z"]
+    L = np.array([g[f"p{i}_x"]*g["scale_x"] for i in range(1, N_ZONES+1)], float)
+    A_plaque = L*W
+    A_ciment = 2*L*H+A_plaque
+    A_ciment[[0, -1]] += W*H
+    return A_plaque, A_ciment, L*W*H
+
+def col(x):
+    # scalaire ou (N,) (un échantillon par ligne) -> diffusable contre les tableaux par zone
+    return np.asarray(x, float)[..., None]
+
+def zone_resistances(prop, g, A_plaque, A_ciment):
+    check_positive(**{k: prop[k] for k in ("h_int", "h_ext", "k_acier", "k_asphalte", "k_ciment", "k_isolant")},
+                   **{k: g[k] for k in ("epaisseur_plaque", "epaisseur_asphalte", "epaisseur_ciment", "epaisseur_isolant")},
+                   A_plaque=A_plaque, A_ciment=A_ciment)
+    R_ext = resistance_vers_exterieur_vec(col(prop["h_int"]), col(prop["h_ext"]), col(g["epaisseur_plaque"]), col(prop["k_acier"]),
+                                          col(g["epaisseur_asphalte"]), col(prop["k_asphalte"]), A_plaque)
+    R_sol = resistance_vers_sol_vec(col(prop["h_int"]), col(g["epaisseur_ciment"]), col(prop["k_ciment"]),
+                                    col(g["epaisseur_isolant"]), col(prop["k_isolant"]), A_ciment)
+    return R_ext, R_sol
+
+def chain_edges(n):
+    i = np.arange(n-1)
+    return np.stack([i, i+1], 1).ravel(), np.stack([i+1, i], 1).ravel()
+
+@dataclass(frozen=True, eq=False, slots=True)
+class ThermalParameters:
+    # tableaux (n_zones,) ou (N, n_zones) pour un lot ; écoulements inter-zones en COO (ei reçoit G*(T[ej]-T[ei]))
+    C: np.ndarray
+    R_ext: np.ndarray
+    R_sol: np.ndarray
+    G_inf: np.ndarray
+    P: np.ndarray
+    G_on: np.ndarray
+    G_off: np.ndarray
+    ei: np.ndarray
+    ej: np.ndarray
+    A_plaque: np.ndarray
+    A_ciment: np.ndarray
+    V: np.ndarray
+    ext: tuple
+    sol: tuple
+    key: str = field(init=False)
+    source: dict = field(default=None, repr=False)
+
+    def __post_init__(self):
+        for name in ARRAYS:
+            a = np.array(getattr(self, name), int if name in ("ei", "ej") else float)
+            a.flags.writeable = False
+            object.__setattr__(self, name, a)
+        nz = self.C.shape[-1]
+        for name in ("R_ext", "R_sol", "G_inf", "P"):
+            if getattr(self, name).shape != self.C.shape: raise ValueError(f"{name}: forme {getattr(self, name).shape}, attendu {self.C.shape}")
+        for name in ("G_on", "G_off"):
+            if getattr(self, name).shape[-1] != len(self.ei): raise ValueError(f"{name}: une valeur par arête requise")
+        if len(self.ej) != len(self.ei) or len(self.ei) and (min(self.ei.min(), self.ej.min()) < 0 or max(self.ei.max(), self.ej.max()) >= nz):
+            raise ValueError("arêtes hors des zones")
+        bad = [n for n in ("C", "R_ext", "R_sol") if not np.all(getattr(self, n) > 0)]
+        bad += [n for n in ("G_inf", "P", "G_on", "G_off") if not np.all(getattr(self, n) >= 0)]
+        if bad: raise ValueError(f"valeurs invalides: {', '.join(bad)}")
+        h = hashlib.blake2b(digest_size=16)
+        for name in ARRAYS:
+            a = getattr(self, name); h.update(str(a.shape).encode()); h.update(a.tobytes())
+        h.update(json.dumps([self.ext, self.sol]).encode())
+        object.__setattr__(self, "key", h.hexdigest())
+
+    def __hash__(self): return hash(self.key)
+    def __eq__(self, other): return isinstance(other, ThermalParameters) and self.key == other.key
+
+    @property
+    def n_zones(self): return self.C.shape[-1]
+
+    @classmethod
+    def from_dict(cls, p):
+        return _from_json(json.dumps(p, sort_keys=True))
+
+    @classmethod
+    def from_file(cls, path="JSON/donnees_simulation.json"):
+        with open(path, "r", encoding="utf-8") as f: return cls.from_dict(json.load(f))
+
+    @classmethod
+    def stack(cls, items):
+        first = items[0]
+        if any(len(x.ei) != len(first.ei) or np.any(x.ei != first.ei) or np.any(x.ej != first.ej) for x in items):
+            raise ValueError("réseaux différents dans le lot")
+        kw = {f.name: np.stack([getattr(x, f.name) for x in items]) for f in fields(cls) if f.name in ARRAYS and f.name not in ("ei", "ej")}
+        return cls(ei=first.ei, ej=first.ej, ext=first.ext, sol=first.sol, **kw)
+
+def compile_parameters(p):
+    # compilation sans cache (from_dict / compile_kernel passent par le cache de _from_json)
+    return build_parameters(p, source=p)
+
+@lru_cache(maxsize=256)
+def _from_json(s):
+    return compile_parameters(json.loads(s))
+
+# clés qui n'entrent que terme à terme dans les formules : un lot se calcule en une passe diffusée
+BATCH_SECTIONS = ("proprietes", "infiltration", "chauffage", "flow_heaterON", "flow_heaterOFF", "capacitance_thermique")
+
+def batchable(key):
+    sec, name = key.split(".")
+    return sec in BATCH_SECTIONS or sec == "geometrie" and name.startswith("epaisseur_")
+
+def stacked(values):
+    # valeurs par zone / arête, scalaires ou (N,) -> (n,) ou (N, n)
+    return np.stack(np.broadcast_arrays(*[np.asarray(v, float) for v in values]), -1)
+
+def build_parameters(p, overrides=None, source=None):
+    # overrides {"section.nom": (N,)} : lot de N jeux de paramètres, tableaux (N, n_zones), sans boucle par échantillon
+    if overrides:
+        p = {k: (dict(v) if isinstance(v, dict) else v) for k, v in p.items()}
+        for key, vals in overrides.items():
+            sec, name = key.split(".")
+            p[sec][name] = np.asarray(vals, float)
+    prop, g, inf = p["proprietes"], p["geometrie"], p["infiltration"]
+    cp = col(prop["cp_air"])
+    A_plaque, A_ciment, V = zone_geometry(g)
+    R_ext, R_sol = zone_resistances(prop, g, A_plaque, A_ciment)
+    cap = p.get("capacitance_thermique", {})
+    # capacitances ajustées du JSON si présentes, sinon air seul (rho*cp*V)
+    C = stacked([cap[f"C{i}"] for i in range(1, N_ZONES+1)]) if "C1" in cap else col(prop["rho_air"])*cp*V
+    m = stacked([.5*inf["gap_1"]+inf["gap_front"], .5*(inf["gap_1"]+inf["gap_2"]), .5*(inf["gap_2"]+inf["gap_3"]),
+                 .5*(inf["gap_3"]+inf["gap_4"]), .5*(inf["gap_4"]+inf["gap_5"]), .5*inf["gap_5"]+inf["gap_back"]])
+    ei, ej = chain_edges(N_ZONES)
+    keys = [f"f{i+1}{j+1}" for i, j in zip(ei, ej)]
+    kw = dict(C=C, R_ext=R_ext, R_sol=R_sol, G_inf=np.abs(m)*cp, P=stacked([p["chauffage"][f"p{i}"] for i in range(1, N_ZONES+1)]),
+              A_plaque=A_plaque, A_ciment=A_ciment, V=V)
+    edges = dict(G_on=stacked([p["flow_heaterON"][k] for k in keys])*cp, G_off=stacked([p["flow_heaterOFF"][k] for k in keys])*cp)
+    if overrides:
+        # même forme (N, ...) pour tout le lot, comme ThermalParameters.stack
+        n = len(next(iter(overrides.values())))
+        kw = {k: np.broadcast_to(v, (n, N_ZONES)) for k, v in kw.items()}
+        edges = {k: np.broadcast_to(v, (n, len(ei))) for k, v in edges.items()}
+    return ThermalParameters(ei=ei, ej=ej, ext=harmonics(p["temperature_exterieure"]), sol=harmonics(p["temperature_sol"]),
+                             source=source, **kw, **edges)
+
+def as_parameters(p):
+    return p if isinstance(p, ThermalParameters) else ThermalParameters.from_dict(p)
@@ -0,0 +1,182 @@
+import argparse, json, os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np, pandas as pd
+import matplotlib.dates as mdates
+import matplotlib.patches as mpatches
+from matplotlib.figure import Figure
+from dataset import Dataset
+from intervals import time_spans, daily_spans, shade
+from aggregation import HEIGHTS, aggregate, group_means
+
+# rendu en lot des figures de Stratification.py, Plateau.py, RegleControle.py et precipitations.py :
+# les fonctions figure_* dessinent dans une Figure donnée (pyplot pour les scripts, Agg ici)
+
+FIGSIZE = {"stratification": (12, 4), "plateau": (14, 6), "regle": (12, 5), "precipitations": (12, 4)}
+PRECIP_CSV = r"dataverse_files\intemperies_2min_complet.csv"
+
+def date_axis(fig, ax, maxticks):
+    ax.xaxis.set_major_locator(mdates.AutoDateLocator(maxticks=maxticks))
+    ax.xaxis.set_major_formatter(mdates.DateFormatter("%Y-%m-%d\n%H:%M"))
+    fig.autofmt_xdate()
+
+def figure_stratification(fig, t, H, avg):
+    ax = fig.subplots()
+    t = pd.to_datetime(t)
+    for k, h in enumerate(HEIGHTS): ax.plot(t, H[:, k], label=f"{h.capitalize()} ({avg})", lw=2)
+    ax.set_xlabel("Temps", fontsize=13, fontweight="bold")
+    ax.set_ylabel("Température moyenne [°C]", fontsize=13, fontweight="bold")
+    date_axis(fig, ax, 10)
+    ax.grid(True); ax.legend(); fig.tight_layout()
+    return fig
+
+def figure_plateau(fig, t, S, groups=(), stations=range(1, 30)):
+    ax = fig.subplots()
+    t = pd.to_datetime(t)
+    if len(groups) == 0:
+        for s in stations: ax.plot(t, S[:, s-1], linewidth=1.2, label=f"S{s}")
+        ax.set_ylabel("Température [°C]", fontsize=12, fontweight="bold")
+    else:
+        G = group_means(S, groups)
+        for g_idx, group in enumerate(groups, start=1):
+            ax.plot(t, G[:, g_idx-1], linewidth=2.0, label=f"Groupe {g_idx}: S {list(group)}")
+        ax.set_ylabel("Température moyenne [°C]", fontsize=12, fontweight="bold")
+    ax.set_xlabel("Temps", fontsize=12, fontweight="bold")
+    date_axis(fig, ax, 12)
+    ax.grid(True); ax.legend(ncol=2); fig.tight_layout()
+    return fig
+
+def figure_regle(fig, t, series, T_ext, start, end, night=False, cold=False, night_hours=(22, 7), cold_threshold=-1):
+    ax = fig.subplots()
+    t_pd = pd.to_datetime(t)
+    for label, y in series: ax.plot(t_pd, y, label=label, linewidth=2)
+    ax.plot(t_pd, T_ext, label="Température extérieure", linewidth=2.5, linestyle='-', color="black")
+
+    ax.set_xlabel("Temps", fontsize=16, fontweight="bold")
+    ax.set_ylabel("Température [°C]", fontsize=16, fontweight="bold")
+    ax.tick_params(axis="both", labelsize=13)
+    ax.grid(False)
+
+    legend_patches = []
+
+    if night:
+        night_start_h, night_end_h = night_hours
+        p = mpatches.Patch(facecolor="gray", alpha=0.45, label=f"Nuit ({night_start_h}h–{night_end_h}h)")
+        shade(ax, *daily_spans(start, end, night_start_h, 24 + night_end_h), facecolor="gray", alpha=0.45)
+        legend_patches.append(p)
+
+    if cold:
+        p = mpatches.Patch(facecolor="gray", alpha=0.45, label=f"T_ext > {cold_threshold}°C")
+        shade(ax, *time_spans(np.asarray(t), T_ext > cold_threshold), facecolor="gray", alpha=0.45)
+        legend_patches.append(p)
+
+    handles, labels = ax.get_legend_handles_labels()
+    for patch in legend_patches:
+        handles.append(patch)
+        labels.append(patch.get_label())
+    ax.legend(handles, labels, fontsize=12, loc="lower right",
+              frameon=True, facecolor="white", framealpha=1.0)
+
+    ax.xaxis.set_major_locator(mdates.AutoDateLocator(maxticks=8))
+    ax.xaxis.set_major_formatter(mdates.DateFormatter("%Y-%m-%d\n%H:%M"))
+    fig.autofmt_xdate()
+    fig.tight_layout()
+    return fig
+
+def figure_precipitations(fig, t, values, avg="1h"):
+    ax = fig.subplots()
+    ax.plot(pd.to_datetime(t), values)
+    ax.set_xlabel("Temps", fontsize=13, fontweight="bold")
+    ax.set_ylabel(f"Précipitation [mm / {avg}]", fontsize=13, fontweight="bold")
+    date_axis(fig, ax, 10)
+    ax.grid(True); fig.tight_layout()
+    return fig
+
+def load_precipitations(filepath=PRECIP_CSV, avg="1h"):
+    df = pd.read_csv(filepath, sep=";")
+    df["Date"] = pd.to_datetime(df["Date"], dayfirst=True, errors="coerce")
+    df.dropna(subset=["Précipitation (mm)", "Date"], inplace=True)
+    # binning → somme des précipitations par intervalle ("H" n'est plus accepté par pandas)
+    return df.set_index("Date")["Précipitation (mm)"].resample(avg.replace("H", "h")).sum()
+
+BUILDERS = {"stratification": figure_stratification, "plateau": figure_plateau,
+            "regle": figure_regle, "precipitations": figure_precipitations}
+
+class Batch:
+    # un seul Dataset ouvert, agrégats partagés entre specs de même (moyenne, fenêtre)
+    def __init__(self, ds, precip_csv=PRECIP_CSV):
+        self.ds, self.precip_csv = ds, precip_csv
+        self.aggregates, self.precip = {}, {}
+
+    def aggregate(self, avg, start=None, end=None):
+        key = (avg, start, end)
+        if key not in self.aggregates:
+            # avg 0 : valeurs instantanées, "W" / "MS"... : resample de pandas (aggregation.aggregate)
+            r = self.ds.rollup_for(avg, start, end)
+            if r is None:
+                w = self.ds.window(start, end)
+                r = aggregate(w.time, w.low, w.mid, w.top, avg)
+            self.aggregates[key] = r
+        return self.aggregates[key]
+
+    def precipitations(self, filepath, avg):
+        key = (filepath, avg)
+        if key not in self.precip: self.precip[key] = load_precipitations(filepath, avg)
+        return self.precip[key]
+
+    def payload(self, spec):
+        kind, start, end = spec["type"], spec.get("start"), spec.get("end")
+        avg = spec.get("avg", "1D")
+        if kind == "stratification":
+            r = self.aggregate(avg, start, end)
+            return {"t": r.time, "H": np.column_stack([r.height_mean(h) for h in HEIGHTS]), "avg": avg}
+        if kind == "plateau":
+            groups = spec.get("groups", [])
+            r = self.aggregate(avg, start, end)
+            t, S = r.time, r.station_means()
+            return {"t": np.asarray(t), "S": np.asarray(S), "groups": groups, "stations": spec.get("stations", range(1, 30))}
+        if kind == "regle":
+            w = self.ds.window(start, end)
+            # bornes absentes du spec : celles des données (daily_spans en a besoin pour la nuit)
+            if start is None: start = w.time[0]
+            if end is None: end = w.time[-1]
+            h = spec.get("height", "Top")
+            series = [(f"{h} S{s}", np.array(w.height(h)[:, s-1])) for s in spec.get("stations", [1, 29])]
+            return {"t": np.array(w.time), "series": series, "T_ext": np.array(w.T_out), "start": start, "end": end,
+                    "night": spec.get("night", False), "cold": spec.get("cold", False),
+                    "night_hours": tuple(spec.get("night_hours", (22, 7))), "cold_threshold": spec.get("cold_threshold", -1)}
+        if kind == "precipitations":
+            avg = spec.get("avg", "1h")
+            p = self.precipitations(spec.get("csv", self.precip_csv), avg).loc[start:end]
+            return {"t": p.index.values, "values": p.values, "avg": avg}
+        raise ValueError(f"type de figure inconnu : {kind}")
+
+def render(kind, payload, out, dpi=150):
+    # exécuté dans un processus de travail : Figure sans pyplot → canevas Agg, format d'après l'extension
+    fig = Figure(figsize=FIGSIZE[kind])
+    BUILDERS[kind](fig, **payload)
+    fig.savefig(out, dpi=dpi)
+    return out
+
+def render_batch(specs, ds, outdir=".", workers=None, dpi=150, precip_csv=PRECIP_CSV):
+    b = Batch(ds, precip_csv)
+    os.makedirs(outdir, exist_ok=True)
+    jobs = []
+    for i, spec in enumerate(specs):
+        out = os.path.join(outdir, spec.get("out", f"{i:02d}_{spec['type']}.png"))
+        jobs.append((spec["type"], b.payload(spec), out))
+    if workers == 1: return [render(k, p, o, dpi) for k, p, o in jobs]
+    with ProcessPoolExecutor(workers) as ex:
+        return list(ex.map(render, *zip(*jobs), [dpi]*len(jobs)))
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("specs", help="fichier JSON : liste de figures {type, start, end, avg, stations, groups, out, ...}")
+    ap.add_argument("--data", default=r"dataverse_files\DataSet.npz")
+    ap.add_argument("--precip", default=PRECIP_CSV)
+    ap.add_argument("--out", default="figures")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--dpi", type=int, default=150)
+    a = ap.parse_args()
+    with open(a.specs, encoding="utf-8") as f: specs = json.load(f)
+    ds = Dataset.open(a.data)
+    for out in render_batch(specs, ds, a.out, a.workers, a.dpi, a.precip): print("Figure :", out)
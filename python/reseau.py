@@ -0,0 +1,90 @@
+import numpy as np
+from dataclasses import dataclass
+from parametres import ThermalParameters, zone_resistances, chain_edges, N_ZONES
+from forcage import harmonics
+
+@dataclass
+class Zone:
+    L: float
+    C: float
+    P: float = 0.
+    m_inf: float = 0.
+    end_wall: bool = False
+
+@dataclass
+class Link:
+    # i reçoit m*cp*(T[j]-T[i])
+    i: int
+    j: int
+    m_on: float
+    m_off: float
+
+class ThermalNetwork:
+    # zones ordonnées de l'avant vers l'arrière : la règle des aérothermes lit T[0] et T[-1]
+    def __init__(self, zones, links, p):
+        self.zones, self.links, self.p = list(zones), list(links), p
+        n = len(self.zones)
+        for l in self.links:
+            if not (0 <= l.i < n and 0 <= l.j < n) or l.i == l.j: raise ValueError(f"lien invalide: {l}")
+
+    @classmethod
+    def from_parameters(cls, p):
+        g, inf, cap = p["geometrie"], p["infiltration"], p["capacitance_thermique"]
+        m = [.5*inf["gap_1"]+inf["gap_front"]]+[.5*(inf[f"gap_{i}"]+inf[f"gap_{i+1}"]) for i in range(1, N_ZONES-1)]+[.5*inf[f"gap_{N_ZONES-1}"]+inf["gap_back"]]
+        zones = [Zone(g[f"p{i+1}_x"]*g["scale_x"], cap[f"C{i+1}"], p["chauffage"][f"p{i+1}"], abs(m[i]), i in (0, N_ZONES-1)) for i in range(N_ZONES)]
+        ei, ej = chain_edges(N_ZONES)
+        links = [Link(i, j, p["flow_heaterON"][f"f{i+1}{j+1}"], p["flow_heaterOFF"][f"f{i+1}{j+1}"]) for i, j in zip(ei, ej)]
+        return cls(zones, links, p)
+
+    @classmethod
+    def from_dict(cls, p):
+        # section "reseau" optionnelle : {"zones": [{L, C, P, m_inf, end_wall}], "liens": [{i, j, m_on, m_off}]}
+        r = p.get("reseau")
+        if r is None: return cls.from_parameters(p)
+        return cls([Zone(**z) for z in r["zones"]], [Link(**l) for l in r["liens"]], p)
+
+    def subdivide(self, n=None, per_zone=None):
+        # découpage en cellules : per_zone=k garde les frontières d'origine, n=N donne des cellules égales
+        x = np.concatenate([[0.], np.cumsum([z.L for z in self.zones])])
+        if per_zone: edges = np.concatenate([np.linspace(x[k], x[k+1], per_zone+1)[:-1] for k in range(len(self.zones))]+[[x[-1]]])
+        else: edges = np.linspace(0, x[-1], n+1)
+        nz = len(edges)-1
+        frac = np.clip(np.minimum(edges[1:, None], x[None, 1:])-np.maximum(edges[:-1, None], x[None, :-1]), 0, None)/np.diff(x)
+        parent = lambda a: frac@np.array([getattr(z, a) for z in self.zones], float)
+        C, P, m = parent("C"), parent("P"), parent("m_inf")
+        # débit moyen de la zone mère pour les liens internes, débits d'origine aux frontières conservées
+        mix = {}
+        for l in self.links:
+            for k in (l.i, l.j): mix.setdefault(k, []).append((l.m_on, l.m_off))
+        direct = {(l.i, l.j): l for l in self.links}
+        links = []
+        for c in range(nz-1):
+            b = edges[c+1]; k = np.searchsorted(x, b)
+            if np.isclose(x[k], b) and (k-1, k) in direct:
+                for a, d in ((c, c+1), (c+1, c)):
+                    l = direct[(k-1, k) if a == c else (k, k-1)]; links.append(Link(a, d, l.m_on, l.m_off))
+            else:
+                on, off = np.mean(mix.get(k-1, [(0., 0.)]), 0)
+                links += [Link(c, c+1, on, off), Link(c+1, c, on, off)]
+        zones = [Zone(edges[c+1]-edges[c], C[c], P[c], m[c], c in (0, nz-1)) for c in range(nz)]
+        return ThermalNetwork(zones, links, self.p)
+
+    def compile(self):
+        p = self.p; g, prop = p["geometrie"], p["proprietes"]; cp = prop["cp_air"]
+        W, H = g["pi_y"]*g["scale_y"], g["pi_z"]
+        L = np.array([z.L for z in self.zones], float)
+        A_plaque = L*W
+        A_ciment = 2*L*H+A_plaque+W*H*np.array([z.end_wall for z in self.zones])
+        R_ext, R_sol = zone_resistances(prop, g, A_plaque, A_ciment)
+        return ThermalParameters(
+            C=[z.C for z in self.zones], R_ext=R_ext, R_sol=R_sol, G_inf=np.array([z.m_inf for z in self.zones])*cp,
+            P=[z.P for z in self.zones], G_on=np.array([l.m_on for l in self.links])*cp, G_off=np.array([l.m_off for l in self.links])*cp,
+            ei=[l.i for l in self.links], ej=[l.j for l in self.links], A_plaque=A_plaque, A_ciment=A_ciment, V=L*W*H,
+            ext=harmonics(p["temperature_exterieure"]), sol=harmonics(p["temperature_sol"]))
+
+if __name__ == "__main__":
+    from simulation_thermique import load_parameters, simulate
+    p = load_parameters()
+    net = ThermalNetwork.from_dict(p).subdivide(n=30)
+    time, T = simulate(net.compile(), 1/60, 48, mode="kernel")
+    print(f"{T.shape[1]} zones, températures moyennes :", np.round(np.mean(T, 0), 2))
@@ -0,0 +1,133 @@
+import json, os, numpy as np, pandas as pd
+from data_analyzer import write_rows, load_store
+from aggregation import HEIGHTS, origin, is_fixed, window_width, ratio, row_values, group_means
+
+LEVELS = {"1h": np.timedelta64(1, "h"), "1D": np.timedelta64(1, "D"), "7D": np.timedelta64(7, "D")}
+# heights / stations : valeurs instantanées déjà moyennées (sur les stations / sur les hauteurs),
+# pour retrouver exactement les moyennes de Stratification.py et Plateau.py
+FIELDS = ("T_out", "RH_out", "low", "mid", "top", "heights", "stations")
+STATS = ("sum", "count", "min", "max")
+
+def reduce_segments(a, starts):
+    a = np.asfortranarray(a); ok = ~np.isnan(a)  # reduceat sur l'axe 0 bien plus rapide en ordre Fortran
+    return (np.add.reduceat(np.where(ok, a, 0.), starts, axis=0, dtype=np.float64), np.add.reduceat(ok.astype(np.int32), starts, axis=0),
+            np.fmin.reduceat(a, starts, axis=0), np.fmax.reduceat(a, starts, axis=0))
+
+class Rollup:
+    # sommes / comptes / extrêmes par intervalle régulier ; moyenne = sum/count sans avertissement sur les cases vides
+    def __init__(self, level, time, data):
+        self.level, self.time, self.data = level, time, data
+
+    def mean(self, field):
+        return ratio(self.data[field]["sum"], self.data[field]["count"])
+
+    def height_mean(self, h):
+        d = self.data["heights"]; i = HEIGHTS.index(h)
+        return ratio(d["sum"][:, i], d["count"][:, i])
+
+    def station_means(self):
+        return self.mean("stations")
+
+    def group_means(self, groups):
+        return group_means(self.station_means(), groups)
+
+    def window(self, start=None, end=None):
+        a = 0 if start is None else np.searchsorted(self.time, np.datetime64(pd.Timestamp(start), "ns"), "left")
+        b = len(self.time) if end is None else np.searchsorted(self.time, np.datetime64(pd.Timestamp(end), "ns"), "right")
+        return self.slice(a, b)
+
+    def slice(self, a, b):
+        return Rollup(self.level, self.time[a:b], {f: {k: v[a:b] for k, v in d.items()} for f, d in self.data.items()})
+
+    def coarsen(self, window, org=None):
+        if window_width(window) == window_width(self.level): return self
+        org = origin(self.time) if org is None else org
+        g = ((self.time-org)//window_width(window)).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, g[1:] != g[:-1]])
+        data = {}
+        for f, d in self.data.items():
+            data[f] = {"sum": np.add.reduceat(d["sum"], starts, axis=0), "count": np.add.reduceat(d["count"], starts, axis=0),
+                       "min": np.fmin.reduceat(d["min"], starts, axis=0), "max": np.fmax.reduceat(d["max"], starts, axis=0)}
+        return Rollup(window, org+g[starts]*window_width(window), data)
+
+def build_rollup(time, arrays, level, chunk_rows=50_000, org=None):
+    w = LEVELS[level]; org = origin(time) if org is None else org
+    b = ((time-org)//w).astype(np.int64); b0 = b[0]; nb = int(b[-1]-b0+1)
+    data = {}
+    for r0 in range(0, len(time), chunk_rows):
+        bb = b[r0:r0+chunk_rows]-b0
+        starts = np.flatnonzero(np.r_[True, bb[1:] != bb[:-1]]); ub = bb[starts]
+        chunk = {f: np.asarray(a[r0:r0+chunk_rows]) for f, a in arrays.items()}
+        if all(h in chunk for h in HEIGHTS):
+            hs = [chunk[h] for h in HEIGHTS]
+            chunk["heights"], chunk["stations"] = row_values(*hs)
+        for f, a in chunk.items():
+            if f not in data:
+                shape = (nb,)+a.shape[1:]
+                data[f] = {"sum": np.zeros(shape), "count": np.zeros(shape, np.int32),
+                           "min": np.full(shape, np.nan, a.dtype), "max": np.full(shape, np.nan, a.dtype)}
+            s, c, mn, mx = reduce_segments(a, starts); d = data[f]
+            d["sum"][ub] += s; d["count"][ub] += c
+            d["min"][ub] = np.fmin(d["min"][ub], mn); d["max"][ub] = np.fmax(d["max"][ub], mx)
+    return Rollup(level, org+(b0+np.arange(nb))*w, data)
+
+def build_rollups(time, T_out, RH_out, low, mid, top):
+    # un seul passage sur les données brutes (1H), les niveaux grossiers sont regroupés depuis 1H
+    r = build_rollup(time, dict(T_out=T_out, RH_out=RH_out, low=low, mid=mid, top=top), "1h")
+    return {"1h": r, "1D": r.coarsen("1D"), "7D": r.coarsen("7D")}
+
+def save_rollups(dirpath, rollups):
+    for lvl, r in rollups.items():
+        d = os.path.join(dirpath, "rollups", lvl); os.makedirs(d, exist_ok=True)
+        np.save(os.path.join(d, "time.npy"), r.time)
+        for f, st in r.data.items():
+            for k, v in st.items(): np.save(os.path.join(d, f"{f}_{k}.npy"), v)
+    with open(os.path.join(dirpath, "rollups", "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"levels": list(rollups)}, f)
+
+def combine(old, new):
+    # intervalles communs (old = premiers intervalles de new) : sommes et comptes additionnés, extrêmes fusionnés
+    L = len(old.time); data = {}
+    for f, d in new.data.items():
+        o = old.data[f]; d = {k: np.array(v) for k, v in d.items()}
+        d["sum"][:L] += o["sum"]; d["count"][:L] += o["count"]
+        d["min"][:L] = np.fmin(d["min"][:L], o["min"]); d["max"][:L] = np.fmax(d["max"][:L], o["max"])
+        data[f] = d
+    return Rollup(new.level, new.time, data)
+
+def write_level(dirpath, r, start):
+    d = os.path.join(dirpath, "rollups", r.level)
+    write_rows(os.path.join(d, "time.npy"), r.time, start)
+    for f, st in r.data.items():
+        for k, v in st.items(): write_rows(os.path.join(d, f"{f}_{k}.npy"), v, start)
+
+def update_rollups(dirpath, time, T_out, RH_out, low, mid, top):
+    # lignes ajoutées en fin de stockage (data_analyzer.append_csv) : agrégats des nouvelles lignes seulement,
+    # fusionnés avec le dernier intervalle existant ; les niveaux 1D / 7D sont regroupés depuis la fin de 1h
+    org = origin(np.load(os.path.join(dirpath, "time.npy"), mmap_mode="r")[:1])
+    r = load_rollup(dirpath, "1h")
+    if r is None or not all(load_rollup(dirpath, lvl) is not None for lvl in LEVELS):
+        return save_rollups(dirpath, build_rollups(*load_store(dirpath)))
+    part = build_rollup(time, dict(T_out=T_out, RH_out=RH_out, low=low, mid=mid, top=top), "1h", org=org)
+    k = int(np.searchsorted(r.time, part.time[0]))
+    write_level(dirpath, combine(r.slice(k, len(r.time)), part), k)
+    r = load_rollup(dirpath, "1h")
+    for lvl in ("1D", "7D"):
+        w = LEVELS[lvl]; t0 = org + ((part.time[0] - org) // w) * w
+        c = load_rollup(dirpath, lvl)
+        write_level(dirpath, r.window(t0, None).coarsen(lvl, org), int(np.searchsorted(c.time, t0)))
+
+def load_rollup(dirpath, level, mmap_mode="r"):
+    d = os.path.join(dirpath, "rollups", level)
+    if not os.path.isfile(os.path.join(d, "time.npy")): return None
+    data = {f: {k: np.load(os.path.join(d, f"{f}_{k}.npy"), mmap_mode=mmap_mode) for k in STATS} for f in FIELDS
+            if os.path.isfile(os.path.join(d, f"{f}_sum.npy"))}
+    if "stations" not in data: return None  # rollups d'une version antérieure : à reconstruire
+    return Rollup(level, np.load(os.path.join(d, "time.npy")), data)
+
+def levels_for_window(window):
+    # niveaux dont le pas divise la fenêtre de moyennage demandée, du plus grossier au plus fin
+    # (aucun pour un intervalle calendaire "W", "MS"... : calcul sur les données brutes)
+    if not window or not is_fixed(window): return []
+    w = window_width(window)
+    return [lvl for lvl in reversed(LEVELS) if w % LEVELS[lvl] == np.timedelta64(0, "ns")]
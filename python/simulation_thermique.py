@@ -1,27 +1,20 @@
-import json, numpy as np, matplotlib.pyplot as plt
-from calcul_resistance_flux import resistance_convection, resistance_conduction, temperature_harmonique
+import json, warnings, numpy as np, matplotlib.pyplot as plt
+from forcage import forcing_from, harmonics, eval_harmonics, MeasuredForcing
+from parametres import ThermalParameters, as_parameters, build_parameters, batchable
+from controllers import ThresholdController
 
 def load_parameters(path="JSON/donnees_simulation.json"):
     with open(path,"r",encoding="utf-8") as f: return json.load(f)
 
 def TempExt(t,p):
-    p=p["temperature_exterieure"]
-    return temperature_harmonique(t,p["T_mean"],p["A"],p["t0"],p["phi"])
+    return eval_harmonics(t,*harmonics(p["temperature_exterieure"]))
 
 def TempSol(t,p):
-    p=p["temperature_sol"]
-    return temperature_harmonique(t,p["T_mean"],p["A"],p["t0"],p["phi"])
+    return eval_harmonics(t,*harmonics(p["temperature_sol"]))
 
 def compute_resistances(p):
-    prop, geom = p["proprietes"], p["geometrie"]
-    Lp, La, Lc, Li = geom["epaisseur_plaque"], geom["epaisseur_asphalte"], geom["epaisseur_ciment"], geom["epaisseur_isolant"]
-    h_int, h_ext = prop["h_int"], prop["h_ext"]
-    R_ext, R_sol = np.zeros(6), np.zeros(6)
-    for i in range(6):
-        Apl, Ac = geom[f"A_plaque_p{i+1}"], geom[f"A_ciment_p{i+1}"]
-        R_ext[i] = resistance_convection(h_int,Apl)+resistance_conduction(Lp,prop["k_acier"],Apl)+resistance_conduction(La,prop["k_asphalte"],Apl)+resistance_convection(h_ext,Apl)
-        R_sol[i] = resistance_convection(h_int,Ac)+resistance_conduction(Lc,prop["k_ciment"],Ac)+resistance_conduction(Li,prop["k_isolant"],Ac)
-    return R_ext,R_sol
+    prm=as_parameters(p)
+    return prm.R_ext.copy(),prm.R_sol.copy()
 
 def compute_Q_aerotherme(i,T,T_ext,heaters,timers,p,dt):
     if timers[i]>0: timers[i]=max(0,timers[i]-dt)
@@ -61,17 +54,122 @@ def q_to_Tnew(Ti,Te,Ts,Q,dt,Re,Rs,C):
     B=(C/dt_s)*Ti+(Te/Re)+(Ts/Rs)+Q
     return B/A
 
-def simulate(p,dt=1/60,t_end=48,debug=False):
-    C=np.array([p["capacitance_thermique"][f"C{i}"] for i in range(1,7)],float)
-    R_ext,R_sol=compute_resistances(p)
+def compile_kernel(p):
+    return as_parameters(p)
+
+def max_stable_dt(K):
+    # schéma semi-implicite : infiltration et débits explicites -> dt_s <= C/(G_inf+somme des G)
+    G=np.maximum(K.G_on,K.G_off)
+    return np.min(K.C/(K.G_inf+np.bincount(K.ei,G,K.n_zones)))/3600
+
+def simulate_kernel(p,time,dt,bc=None,controller=None):
+    K=compile_kernel(p); n=len(time); nz=K.n_zones
+    ctl=(controller or ThresholdController()).reset(K,nz,dt)
+    if dt>max_stable_dt(K): warnings.warn(f"dt={dt:.4g} h > {max_stable_dt(K):.4g} h : schéma explicite instable, utiliser mode=\"implicit\"")
+    ei,ej,G_inf,R_ext,R_sol=K.ei,K.ej,K.G_inf,K.R_ext,K.R_sol
+    dt_s=dt*3600; Cdt=K.C/dt_s
+    A=Cdt+(1/R_ext)+(1/R_sol)
+    Te_vec,Ts_vec=forcing_from(p,bc).on_grid(time)
+    TeR=Te_vec[:,None]/R_ext; TsR=Ts_vec[:,None]/R_sol
+    T=np.zeros((n,nz)); T[0]=30.
+    for k in range(1,n):
+        Te,To=Te_vec[k],T[k-1]
+        G=K.G_on if np.count_nonzero(ctl.heaters) else K.G_off
+        Q=ctl(time[k],To,Te,dt)+G_inf*(Te-To)+np.bincount(ei,G*(To[ej]-To[ei]),nz)
+        T[k]=(Cdt*To+TeR[k]+TsR[k]+Q)/A
+    return T
+
+def apply_overrides(p,overrides,n):
+    out=[]
+    for s in range(n):
+        q={k:(dict(v) if isinstance(v,dict) else v) for k,v in p.items()}
+        for key,vals in overrides.items():
+            sec,name=key.split(".")
+            q[sec][name]=float(vals[s])
+        out.append(q)
+    return out
+
+def compile_batch(p,overrides):
+    for key in overrides:
+        if key.split(".")[0].startswith("temperature_"):
+            raise ValueError(f"{key}: le forçage aux frontières est commun à tout le lot")
+    n=len(next(iter(overrides.values()))) if overrides else 1
+    if any(len(v)!=n for v in overrides.values()): raise ValueError("overrides de longueurs différentes")
+    if isinstance(p,ThermalParameters):
+        if not overrides: return ThermalParameters.stack([p])
+        if p.source is None: raise ValueError("overrides : paramètres JSON requis")
+        p=p.source
+    for key in overrides:
+        # clé mal orthographiée : sinon écrite dans une entrée que le modèle ne lit pas, lot plat sans erreur
+        sec,_,name=key.partition(".")
+        if not (sec in p and isinstance(p[sec],dict) and name in p[sec]): raise KeyError(f"override inconnu : {key}")
+    if all(batchable(k) for k in overrides): return build_parameters(p,{k:np.asarray(v,float) for k,v in overrides.items()})
+    return ThermalParameters.stack([compile_kernel(q) for q in apply_overrides(p,overrides,n)])
+
+def _run_batch(K,time,Te_vec,Ts_vec,dt,reduce,stride,ctl,T0=30.):
+    N,nz=K.C.shape; n=len(Te_vec)
+    ei,ej,G_inf,R_ext,R_sol,P=K.ei,K.ej,K.G_inf,K.R_ext,K.R_sol,K.P
+    idx=(ei+nz*np.arange(N)[:,None]).ravel()
+    dt_s=dt*3600; Cdt=K.C/dt_s
+    A=Cdt+(1/R_ext)+(1/R_sol)
+    T=np.broadcast_to(np.asarray(T0,float),(N,nz)).copy(); ctl.reset(K,(N,nz),dt)
+    if reduce=="series": out=np.empty((N,(n-1)//stride+1,nz),np.float32); out[:,0]=T
+    else: s_sum,s_min,s_max=T.copy(),T.copy(),T.copy()
+    for k in range(1,n):
+        Te,Ts=Te_vec[k],Ts_vec[k]
+        G=np.where(ctl.heaters.any(1)[:,None],K.G_on,K.G_off)
+        Q=ctl(time[k],T,Te,dt)+G_inf*(Te-T)+np.bincount(idx,(G*(T[:,ej]-T[:,ei])).ravel(),N*nz).reshape(N,nz)
+        T=(Cdt*T+(Te/R_ext)+(Ts/R_sol)+Q)/A
+        if reduce=="series":
+            if k%stride==0: out[:,k//stride]=T
+        else:
+            s_sum+=T; np.minimum(s_min,T,out=s_min); np.maximum(s_max,T,out=s_max)
+    if reduce=="series": return out
+    return {"T_mean":s_sum/n,"T_min":s_min,"T_max":s_max,"T_final":T,**ctl.report()}
+
+def simulate_batch(p,overrides,dt=1/60,t_end=48,reduce="stats",stride=1,chunk=4096,bc=None,controller=None,T0=30.):
+    # T0 : température initiale, scalaire ou par zone
+    if reduce not in ("stats","series"): raise ValueError(f"reduce inconnu: {reduce}")
+    n=int(t_end/dt)+1
+    time=np.linspace(0,t_end,n)
+    Te_vec,Ts_vec=forcing_from(p,bc).on_grid(time)
+    N=len(next(iter(overrides.values()))) if overrides else 1
+    ctl=controller or ThresholdController()
+    parts=[]
+    for a in range(0,N,chunk):
+        K=compile_batch(p,{k:np.asarray(v)[a:a+chunk] for k,v in overrides.items()})
+        parts.append(_run_batch(K,time,Te_vec,Ts_vec,dt,reduce,stride,ctl.subset(slice(a,a+chunk),N),T0))
+    if reduce=="series": return time[::stride],np.concatenate(parts)
+    return time,{k:np.concatenate([r[k] for r in parts]) for k in parts[0]}
+
+def simulate(p,dt=1/60,t_end=48,debug=False,mode="loop",bc=None,controller=None,report=False):
+    # report=True : renvoie aussi {"heater_kWh","heater_hours","cycles"} par zone
     n=int(t_end/dt)+1
     time=np.linspace(0,t_end,n)
+    bc=forcing_from(p,bc)
+    if controller is not None and mode in ("loop","adaptive"): raise ValueError(f"mode {mode} : règle d'origine seulement, utiliser mode=\"kernel\" ou \"implicit\"")
+    if mode in ("kernel","implicit"):
+        ctl=controller or ThresholdController()
+        if mode=="kernel": T=simulate_kernel(p,time,dt,bc,ctl)
+        else:
+            from solveur_implicite import simulate_implicit
+            T=simulate_implicit(p,time,dt,bc=bc,controller=ctl)
+        return (time,T,ctl.report()) if report else (time,T)
+    if mode=="adaptive":
+        from simulation_adaptative import simulate_adaptive, adaptive_report
+        time,T,events,on_hours=simulate_adaptive(p,t_end,bc=bc)
+        return (time,T,adaptive_report(p,events,on_hours)) if report else (time,T)
+    if mode!="loop": raise ValueError(f"mode inconnu: {mode}")
+    if report: raise ValueError("report : modes kernel, implicit, adaptive ou simulate_batch")
+    prm=as_parameters(p); p=prm.source
+    if p is None or prm.n_zones!=6: raise ValueError("mode loop : modèle JSON à 6 zones seulement, utiliser mode=\"kernel\"")
+    C,R_ext,R_sol=prm.C,prm.R_ext,prm.R_sol
     T=np.zeros((n,6)); T[0]=30.
     heaters=np.zeros(6,int); timers=np.zeros(6,float)
+    Te_vec,Ts_vec=bc.on_grid(time)
 
     for k in range(1,n):
-        t=time[k]
-        Te,Ts=TempExt(t,p),TempSol(t,p)
+        Te,Ts=Te_vec[k],Ts_vec[k]
         flow=p["flow_heaterON"] if np.any(heaters==1) else p["flow_heaterOFF"]
         for i in range(6):
             Ti=T[k-1,i]
@@ -82,16 +180,21 @@ def simulate(p,dt=1/60,t_end=48,debug=False):
             T[k,i]=q_to_Tnew(Ti,Te,Ts,Q,dt,R_ext[i],R_sol[i],C[i])
     return time,T
 
+def simulate_measured(p,npz_path=r"dataverse_files\DataSet.npz",start=None,end=None,dt=1/60,mode="kernel"):
+    bc=MeasuredForcing(p,npz_path,start,end)
+    time,T=simulate(p,dt,bc.duration,mode=mode,bc=bc)
+    return bc.start+(time*3600e9).astype("timedelta64[ns]"),T,bc
+
 if __name__=="__main__":
     p=load_parameters()
     t_end,dt=168,1/240
-    time,T=simulate(p,dt,t_end)
+    bc=forcing_from(p)
+    time,T=simulate(p,dt,t_end,mode="kernel",bc=bc)
     print("Dernières températures :",T[-1])
     print("\nTempératures moyennes :")
     for i,m in enumerate(np.mean(T,0)): print(f"T{i+1}_moy = {m:.2f} °C")
 
-    Te_vec=np.array([TempExt(t,p) for t in time])
-    Ts_vec=np.array([TempSol(t,p) for t in time])
+    Te_vec,Ts_vec=bc.on_grid(time)
 
     plt.figure(figsize=(12,6))
     for i in range(6): plt.plot(time,T[:,i],label=f"T{i+1}")
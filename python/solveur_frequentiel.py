@@ -0,0 +1,75 @@
+import numpy as np
+from simulation_thermique import load_parameters, compile_kernel, compile_batch
+from parametres import ThermalParameters
+
+# régime établi sous forçage harmonique (HarmonicForcing) sans commutation des aérothermes : le système
+# C dT/dt = -M T + b(t) est linéaire, chaque période t0 du forçage se résout en une fois par admittance
+# complexe (i w C + M) X = b_w, la moyenne par M T = b_0. t en heures, C en J/K -> i w C/3600.
+
+def conductance_matrix(K, G):
+    # M (..., nz, nz) : pertes vers l'extérieur / le sol / infiltration sur la diagonale, laplacien des débits G
+    nz, ne = K.n_zones, len(K.ei)
+    E = np.zeros((nz, ne)); E[K.ei, np.arange(ne)] = 1
+    G = np.broadcast_to(G, K.C.shape[:-1]+(ne,))
+    M = np.zeros(K.C.shape+(nz,))
+    M[..., K.ei, K.ej] -= G
+    d = np.arange(nz)
+    M[..., d, d] += 1/K.R_ext+1/K.R_sol+K.G_inf+G@E.T
+    return M
+
+class PeriodicResponse:
+    # T(t) = T_mean + somme sur les périodes de Re(X exp(i w t)) ; tableaux (..., nz) pour un lot
+    def __init__(self, T_mean, terms):
+        self.T_mean, self.terms = T_mean, terms
+
+    def __call__(self, t):
+        # (..., n, nz) comme simulate, sans le transitoire de départ
+        t = np.asarray(t, float)[:, None]
+        T = self.T_mean[..., None, :]+np.zeros_like(t)
+        for t0, X in self.terms.items(): T = T+np.real(X[..., None, :]*np.exp(2j*np.pi*t/t0))
+        return T
+
+    def amplitude(self, t0): return np.abs(self.terms[t0])
+    def phase(self, t0): return np.angle(self.terms[t0])
+
+    def t_max(self, t0):
+        # heure du maximum dans la période [0, t0[ (à comparer au phi du forçage)
+        return (-self.phase(t0)*t0/(2*np.pi)) % t0
+
+def periodic_response(p, heaters_on=False):
+    # heaters_on : tous les aérothermes en marche en continu (débits G_on, puissance P), sinon tous à l'arrêt
+    K = p if isinstance(p, ThermalParameters) else compile_kernel(p)
+    M = conductance_matrix(K, K.G_on if heaters_on else K.G_off)
+    B_ext, B_sol = 1/K.R_ext+K.G_inf, 1/K.R_sol
+    (Te, h_ext), (Ts, h_sol) = K.ext, K.sol
+    b0 = B_ext*Te+B_sol*Ts+(K.P if heaters_on else 0.)
+    T_mean = np.linalg.solve(M, b0[..., None])[..., 0]
+    rhs = {}
+    for B, h in ((B_ext, h_ext), (B_sol, h_sol)):
+        for A, t0, phi in h:
+            rhs[t0] = rhs.get(t0, 0)+B*A*np.exp(-2j*np.pi*phi/t0)
+    terms = {}
+    for t0, b in rhs.items():
+        Y = M+np.eye(K.n_zones)*(2j*np.pi/t0*K.C/3600)[..., None]
+        terms[t0] = np.linalg.solve(Y, b[..., None])[..., 0]
+    return PeriodicResponse(T_mean, terms)
+
+def steady_state(p, heaters_on=False):
+    # régime permanent sous forçage constant égal aux moyennes T_mean du JSON
+    return periodic_response(p, heaters_on).T_mean
+
+def periodic_batch(p, overrides, heaters_on=False):
+    # lot d'études (ex. {"proprietes.k_isolant": ..., "geometrie.epaisseur_isolant": ...}) : un seul solve empilé
+    return periodic_response(compile_batch(p, overrides), heaters_on)
+
+if __name__ == "__main__":
+    p = load_parameters()
+    r = periodic_response(p)
+    print("Régime périodique, aérothermes à l'arrêt :")
+    for t0 in r.terms:
+        for i, (m, a, tm) in enumerate(zip(r.T_mean, r.amplitude(t0), r.t_max(t0)), start=1):
+            print(f"Zone {i} : moy {m:.2f} °C, amplitude {a:.2f} °C (période {t0:g} h), max à {tm:.1f} h")
+    k = np.linspace(.01, .1, 10)
+    rb = periodic_batch(p, {"proprietes.k_isolant": k})
+    print("\nk_isolant -> moyenne des zones :")
+    for ki, m in zip(k, rb.T_mean): print(f"{ki:.3f} : {np.round(m, 2)}")
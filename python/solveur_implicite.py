@@ -0,0 +1,28 @@
+import numpy as np, scipy.sparse as sp
+from scipy.sparse.linalg import splu
+from simulation_thermique import compile_kernel
+from controllers import ThresholdController
+from forcage import forcing_from
+
+def assemble_operator(K,G,dt):
+    # (C/dt + 1/R_ext + 1/R_sol + G_inf + L) T_new = second membre, L = laplacien des débits inter-zones
+    nz=K.n_zones; dt_s=dt*3600
+    diag=K.C/dt_s+1/K.R_ext+1/K.R_sol+K.G_inf+np.bincount(K.ei,G,nz)
+    M=sp.coo_matrix((-G,(K.ei,K.ej)),shape=(nz,nz))+sp.diags(diag)
+    return M.tocsc()
+
+def simulate_implicit(p,time,dt,K=None,bc=None,controller=None):
+    K=K or compile_kernel(p); n=len(time); nz=K.n_zones
+    G_inf,R_ext,R_sol=K.G_inf,K.R_ext,K.R_sol
+    Cdt=K.C/(dt*3600)
+    Te_vec,Ts_vec=forcing_from(p,bc).on_grid(time)
+    rhs=Te_vec[:,None]/R_ext+Ts_vec[:,None]/R_sol+Te_vec[:,None]*G_inf
+    T=np.zeros((n,nz)); T[0]=30.
+    ctl=(controller or ThresholdController()).reset(K,nz,dt)
+    lu={}
+    for k in range(1,n):
+        on=bool(np.count_nonzero(ctl.heaters))
+        if on not in lu: lu[on]=splu(assemble_operator(K,K.G_on if on else K.G_off,dt))
+        b=Cdt*T[k-1]+rhs[k]+ctl(time[k],T[k-1],Te_vec[k],dt)
+        T[k]=lu[on].solve(b)
+    return T